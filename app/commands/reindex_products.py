@@ -0,0 +1,35 @@
+"""Rebuild the full-text search vector of every product.
+
+With `TENANCY_MODE` set, pass the shop to reindex.
+
+Usage:
+    python -m app.commands.reindex_products [--tenant shop-id]
+"""
+
+import argparse
+import asyncio
+from typing import Optional
+
+from app.config import settings
+from app.database import db, tenant_pool, use_db
+from app.routes.products.search import refresh_search_vectors
+
+
+async def main(tenant: Optional[str] = None):
+    if settings.TENANCY_MODE == "single":
+        await db.connect()
+    try:
+        async with use_db(tenant) as shop_db:
+            updated = await refresh_search_vectors(shop_db)
+        print(f"Reindexed {updated} products")
+    finally:
+        await tenant_pool.stop()
+        if db.is_connected():
+            await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenant", help="Shop to reindex (multi-tenant mode)")
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant))
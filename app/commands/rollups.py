@@ -0,0 +1,36 @@
+"""Rebuild the analytics rollups from the full order history.
+
+Run it once after applying the schema to an existing database, or whenever
+the rollups need to be recomputed. With `TENANCY_MODE` set, pass the shop.
+
+Usage:
+    python -m app.commands.rollups [--tenant shop-id]
+"""
+
+import argparse
+import asyncio
+from typing import Optional
+
+from app.config import settings
+from app.database import db, tenant_pool, use_db
+from app.routes.analytics.rollups import backfill_rollups
+
+
+async def main(tenant: Optional[str] = None):
+    if settings.TENANCY_MODE == "single":
+        await db.connect()
+    try:
+        async with use_db(tenant) as shop_db:
+            await backfill_rollups(shop_db)
+        print("Rebuilt analytics rollups")
+    finally:
+        await tenant_pool.stop()
+        if db.is_connected():
+            await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenant", help="Shop to rebuild (multi-tenant mode)")
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant))
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -5,12 +7,54 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Tiendify"
     SECRET_KEY: str
     DATABASE_URL: str
+    DATABASE_READ_URL: Optional[str] = None
+    READ_YOUR_WRITES_WINDOW: float = 5
+    TENANCY_MODE: Literal["single", "header", "host"] = "single"
+    TENANT_HEADER: str = "X-Tenant-ID"
+    TENANT_BASE_DOMAIN: Optional[str] = None
+    TENANT_DATABASE_URL_TEMPLATE: Optional[str] = None
+    TENANT_POOL_SIZE: int = 100
+    TENANT_IDLE_TIMEOUT: int = 300
+    TENANT_CONNECTION_LIMIT: int = 2
     AZURE_STORAGE: str
     AZURE_PUBLIC_CONTAINER: str
     KEYCLOAK_URL: str
     KEYCLOAK_CLIENT_ID: str
     KEYCLOAK_REALM: str
     KEYCLOAK_CLIENT_SECRET: str
+    KEYCLOAK_TIMEOUT: float = 10
+    KEYCLOAK_MAX_RETRIES: int = 2
+    STARTUP_WARMUP_TIMEOUT: float = 10
+    JWKS_CACHE_TTL: int = 300
+    JWKS_MIN_REFRESH_INTERVAL: int = 30
+    SECRET_KEY_CACHE_TTL: int = 300
+    SECRET_KEY_CACHE_SIZE: int = 1024
+    TOKEN_CACHE_TTL: int = 300
+    TOKEN_CACHE_SIZE: int = 4096
+    CUSTOMER_CACHE_TTL: int = 60
+    CUSTOMER_CACHE_SIZE: int = 4096
+    PRODUCTS_COUNT_CACHE_TTL: int = 30
+    SEARCH_TEXT_CONFIG: str = "simple"
+    CATEGORIES_CACHE_TTL: Optional[int] = 60
+    RESPONSE_CACHE_BACKEND: Literal["memory", "redis", "none"] = "memory"
+    RESPONSE_CACHE_TTL: float = 5
+    RESPONSE_CACHE_STALE_TTL: float = 30
+    RESPONSE_CACHE_SIZE: int = 1024
+    REDIS_URL: Optional[str] = None
+    METRICS_TOKEN: Optional[str] = None
+    STORAGE_BACKEND: Literal["azure", "local"] = "azure"
+    STORAGE_LOCAL_ROOT: str = "media"
+    STORAGE_LOCAL_URL: str = "http://localhost:8000/media"
+    STORAGE_CHUNK_SIZE: int = 4 * 1024 * 1024
+    STORAGE_MAX_CONCURRENCY: int = 4
+    IMAGE_WORKERS: Optional[int] = None
+    PRODUCTS_IMPORT_BATCH_SIZE: int = 1000
+    PRODUCTS_BULK_UPDATE_BATCH_SIZE: int = 1000
+    ORDERS_EXPORT_BATCH_SIZE: int = 500
+    STOCK_RESERVATION_TTL: int = 900
+    CHECKOUT_MAX_PENDING_ORDERS: int = 3
+    RESERVATION_SWEEP_INTERVAL: int = 30
+    SHIPPING_ESTIMATED_DELIVERY_DAYS: int = 5
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded in-memory LRU cache whose entries expire after a TTL.
+
+    Safe to share between the event loop and threadpool-run dependencies.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, dropping it if it has expired.
+
+        Args:
+            key (Hashable): Cache key.
+            default (Any, optional): Value returned on a miss. Defaults to None.
+
+        Returns:
+            Any: The cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to store.
+            ttl (float, optional): Entry TTL in seconds. Defaults to the cache TTL.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value (expired or not)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
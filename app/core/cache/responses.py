@@ -0,0 +1,306 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional
+
+import orjson
+from fastapi import Request, Response
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.database import use_read_db
+from app.database.routing import reads_from_primary
+from app.database.tenancy import current_tenant, tenant_key
+from prisma import Prisma as ShopsClient
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+
+class CacheBackend(ABC):
+    """Byte store shared by the response caches."""
+
+    @abstractmethod
+    async def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        """Get several values at once (None for missing keys)."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store a value for `ttl` seconds."""
+
+    @abstractmethod
+    async def incr(self, key: str) -> None:
+        """Increment a counter that never expires."""
+
+    async def close(self) -> None:
+        """Release the resources held by the backend."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process backend. Invalidations are not seen by other workers, which
+    serve their copies until they expire."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._entries = TTLCache(maxsize=maxsize, ttl=None)
+        self._counters: dict[str, bytes] = {}
+
+    async def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        return [self._counters.get(key) or self._entries.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries.set(key, value, ttl)
+
+    async def incr(self, key: str) -> None:
+        self._counters[key] = str(int(self._counters.get(key, 0)) + 1).encode()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend on a Redis-compatible server, shared by every worker.
+
+    Requires the `redis` package.
+    """
+
+    def __init__(self, url: str):
+        from redis.asyncio import Redis
+
+        self._client = Redis.from_url(url)
+
+    async def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        return await self._client.mget(keys)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def incr(self, key: str) -> None:
+        await self._client.incr(key)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    """Get the configured response cache backend, creating it on first use.
+
+    Returns:
+        Optional[CacheBackend]: The backend selected by `RESPONSE_CACHE_BACKEND`,
+            or None if response caching is disabled.
+    """
+    global _backend
+
+    if _backend is None and settings.RESPONSE_CACHE_BACKEND == "memory":
+        _backend = MemoryCacheBackend(settings.RESPONSE_CACHE_SIZE)
+    elif _backend is None and settings.RESPONSE_CACHE_BACKEND == "redis":
+        _backend = RedisCacheBackend(settings.REDIS_URL)
+
+    return _backend
+
+
+async def close_cache_backend() -> None:
+    """Close the response cache backend, if it was created."""
+    global _backend
+
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def encode_entry(response: Response, tag_versions: list[int]) -> bytes:
+    header = {
+        "status_code": response.status_code,
+        "media_type": response.media_type,
+        "headers": {
+            name: value
+            for name, value in response.headers.items()
+            if name not in ("content-length", "content-type")
+        },
+        "created_at": time.time(),
+        "tag_versions": tag_versions,
+    }
+    return orjson.dumps(header) + b"\n" + response.body
+
+
+def decode_entry(entry: bytes) -> tuple[dict, bytes]:
+    header, _, body = entry.partition(b"\n")
+    return orjson.loads(header), body
+
+
+def cache_key(request: Request) -> str:
+    """Build a cache key from the route and the normalized query parameters."""
+    route = request.scope.get("route")
+    path = request.url.path if route is None else request.scope["route"].path
+    params = sorted(
+        (name, value) for name, value in request.query_params.multi_items() if value
+    )
+    return orjson.dumps([path, request.path_params, params]).decode()
+
+
+class ResponseCache:
+    """Cache of serialized responses, invalidated by tags.
+
+    Each entry records the version of its tags when it was built; bumping a
+    tag version (`invalidate`) makes every entry carrying it a miss, even one
+    being computed at that moment. Misses are coalesced per key so only one
+    request per process runs the loader, and entries older than `ttl` are
+    served for `stale_ttl` more seconds while one request refreshes them in
+    the background, on its own database client: the one of the request that
+    triggered it is released once the response is sent.
+    """
+
+    def __init__(self, namespace: str, ttl: float = 5, stale_ttl: float = 30):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # Loads in progress, with the tag versions they were started under.
+        self._inflight: dict[str, tuple[list[int], asyncio.Future]] = {}
+        self._refreshing: set[asyncio.Task] = set()
+
+    def _tag_keys(self, tags: list[str]) -> list[str]:
+        return [tenant_key(f"{self.namespace}:tag:{tag}") for tag in tags]
+
+    async def fetch(
+        self,
+        request: Request,
+        shop_db: ShopsClient,
+        tags: list[str],
+        loader: Callable[[ShopsClient], Awaitable[Response]],
+    ) -> Response:
+        """Serve a response from the cache, building it with `loader` on a miss.
+
+        Only 200 responses are cached; anything else is returned as is.
+
+        Args:
+            request (Request): Current request, used to build the key.
+            shop_db (ShopsClient): Database client of the request.
+            tags (list[str]): Tags the response depends on.
+            loader (Callable[[ShopsClient], Awaitable[Response]]): Builds the
+                response with the given database client.
+
+        Returns:
+            Response: The cached or freshly built response.
+        """
+        backend = get_cache_backend()
+        # Sessions that just wrote bypass the cache, which may hold a response
+        # built from a replica that had not caught up with the write.
+        if backend is None or reads_from_primary(request):
+            return await loader(shop_db)
+
+        key = tenant_key(f"{self.namespace}:{cache_key(request)}")
+        entry, *versions = await backend.get_many([key, *self._tag_keys(tags)])
+        tag_versions = [int(version or 0) for version in versions]
+
+        if entry is not None:
+            header, body = decode_entry(entry)
+
+            if header["tag_versions"] == tag_versions:
+                age = time.time() - header["created_at"]
+
+                if age < self.ttl:
+                    return self._response(header, body, "HIT")
+
+                if age < self.ttl + self.stale_ttl:
+                    if key not in self._inflight:
+                        future = asyncio.get_running_loop().create_future()
+                        self._inflight[key] = (tag_versions, future)
+                        task = asyncio.create_task(
+                            self._refresh(
+                                backend,
+                                key,
+                                tag_versions,
+                                current_tenant.get(),
+                                loader,
+                                future,
+                            )
+                        )
+                        self._refreshing.add(task)
+                        task.add_done_callback(self._refreshing.discard)
+                    return self._response(header, body, "STALE")
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] == tag_versions:
+            try:
+                header, body = decode_entry(await asyncio.shield(inflight[1]))
+                return self._response(header, body, "MISS")
+            except asyncio.CancelledError:
+                # The leading request was cancelled; load it here instead.
+                if not inflight[1].cancelled():
+                    raise
+
+        response = await self._load(
+            backend, key, tag_versions, lambda: loader(shop_db)
+        )
+        response.headers[CACHE_STATUS_HEADER] = "MISS"
+        return response
+
+    async def _load(
+        self,
+        backend: CacheBackend,
+        key: str,
+        tag_versions: list[int],
+        loader: Callable[[], Awaitable[Response]],
+        future: Optional[asyncio.Future] = None,
+    ) -> Response:
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = (tag_versions, future)
+
+        try:
+            response = await loader()
+            entry = encode_entry(response, tag_versions)
+            future.set_result(entry)
+
+            if response.status_code == 200:
+                await backend.set(key, entry, self.ttl + self.stale_ttl)
+
+            return response
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # Mark the exception as retrieved when nobody else is waiting.
+                future.exception()
+            raise
+        finally:
+            future.cancel()
+            if self._inflight.get(key, (None, None))[1] is future:
+                del self._inflight[key]
+
+    async def _refresh(
+        self,
+        backend: CacheBackend,
+        key: str,
+        tag_versions: list[int],
+        tenant: Optional[str],
+        loader: Callable[[ShopsClient], Awaitable[Response]],
+        future: asyncio.Future,
+    ) -> None:
+        try:
+            async with use_read_db(tenant) as shop_db:
+                await self._load(
+                    backend, key, tag_versions, lambda: loader(shop_db), future
+                )
+        except Exception:
+            # The stale entry keeps being served until it expires.
+            pass
+
+    async def invalidate(self, *tags: str) -> None:
+        """Make every entry depending on any of the tags a miss.
+
+        Args:
+            *tags (str): Tags to invalidate.
+        """
+        backend = get_cache_backend()
+        if backend is None:
+            return
+
+        for tag_key in self._tag_keys(list(tags)):
+            await backend.incr(tag_key)
+
+    @staticmethod
+    def _response(header: dict, body: bytes, status: str) -> Response:
+        return Response(
+            content=body,
+            status_code=header["status_code"],
+            media_type=header["media_type"],
+            headers={**header["headers"], CACHE_STATUS_HEADER: status},
+        )
@@ -0,0 +1,154 @@
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests being served.",
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size by route template.",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Prisma query latency by model and action.",
+    ["model", "action"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Prisma queries run while serving a request, by route template.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+JWKS_FETCH_LATENCY = Histogram(
+    "jwks_fetch_duration_seconds",
+    "Latency of fetching the Keycloak signing keys.",
+    ["outcome"],
+)
+SECRET_KEY_VERIFY_LATENCY = Histogram(
+    "secret_key_verify_duration_seconds",
+    "Latency of bcrypt secret key verifications.",
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+
+# Number of Prisma queries of the request being served, if any.
+_request_queries: ContextVar[Optional[list[int]]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, size and query count per route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        queries = [0]
+        token = _request_queries.set(queries)
+
+        async def send_with_metrics(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            _request_queries.reset(token)
+
+            # The router stores the matched route in the scope, so routes are
+            # labelled by template (e.g. /products/{product_id}).
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            REQUEST_LATENCY.labels(method, path, str(status)).observe(elapsed)
+            RESPONSE_SIZE.labels(method, path).observe(size)
+            DB_QUERIES_PER_REQUEST.labels(method, path).observe(queries[0])
+
+
+def instrument_prisma() -> None:
+    """Time every Prisma query by model and action, and count queries per request.
+
+    Wraps the query method shared by all Prisma clients (including the ones
+    created for transactions). Batched queries are not counted.
+    """
+    from prisma._base_client import AsyncBasePrisma
+
+    execute = AsyncBasePrisma._execute
+    if getattr(execute, "__instrumented__", False):
+        return
+
+    @wraps(execute)
+    async def timed_execute(self, *, method, arguments, model=None, root_selection=None):
+        name = getattr(model, "__prisma_model__", None) or "raw"
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+
+        start = time.perf_counter()
+        try:
+            return await execute(
+                self,
+                method=method,
+                arguments=arguments,
+                model=model,
+                root_selection=root_selection,
+            )
+        finally:
+            DB_QUERY_LATENCY.labels(name, method).observe(time.perf_counter() - start)
+
+    timed_execute.__instrumented__ = True
+    AsyncBasePrisma._execute = timed_execute
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format.
+
+    Aggregates every worker process when `PROMETHEUS_MULTIPROC_DIR` is set.
+
+    Returns:
+        tuple[bytes, str]: The metrics and their content type.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(), CONTENT_TYPE_LATEST
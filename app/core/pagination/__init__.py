@@ -0,0 +1,91 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor.
+
+    Args:
+        *values (Any): Sort key values (datetimes, ints or strings).
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): Cursor received from the client.
+        size (int): Expected number of sort key values.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+
+    Returns:
+        list: Sort key values, datetimes still in ISO format.
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+
+def decode_datetime_cursor(
+    cursor: str, id_type: type = int
+) -> tuple[Optional[datetime], Any]:
+    """Decode a `(timestamp, id)` cursor.
+
+    Args:
+        cursor (str): Cursor received from the client.
+        id_type (type, optional): Type of the id column. Defaults to int.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+
+    Returns:
+        tuple[Optional[datetime], Any]: The timestamp and the id.
+    """
+    timestamp, id_ = decode_cursor(cursor, 2)
+
+    try:
+        return (
+            datetime.fromisoformat(timestamp) if timestamp else None,
+            id_type(id_),
+        )
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after_desc(field: str, value: Optional[datetime], id_: Any) -> dict:
+    """Build the Prisma `where` clause for rows after `(value, id_)` when
+    ordering by `field` and `id` descending (Postgres puts NULLs first).
+
+    Args:
+        field (str): Timestamp column name.
+        value (Optional[datetime]): Timestamp of the last row of the previous page.
+        id_ (Any): Id of the last row of the previous page.
+
+    Returns:
+        dict: Prisma `where` clause.
+    """
+    if value is None:
+        return {"OR": [{field: None, "id": {"lt": id_}}, {field: {"not": None}}]}
+
+    return {"OR": [{field: {"lt": value}}, {field: value, "id": {"lt": id_}}]}
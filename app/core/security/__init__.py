@@ -1,24 +1,25 @@
+import hashlib
+import secrets
+import time
 from typing import Annotated, Optional, Union
 from urllib.parse import quote
 
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import APIKeyCookie, OAuth2PasswordBearer
-from jwt import PyJWKClient, decode
-from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
-from keycloak import KeycloakOpenID
+from jwt import decode
+from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, PyJWKClientError
 from passlib.context import CryptContext
 
 from app.config import settings
+from app.core.cache import TTLCache
+from app.core.metrics import SECRET_KEY_VERIFY_LATENCY
+from app.core.security.jwks import JWKSCache
+from app.database import get_db
+from app.database.tenancy import tenant_key
 from app.models.secretKey import SecretKeyValue
 from app.models.user import UserTokenInfo
 
-keycloak_openid = KeycloakOpenID(
-    server_url=settings.KEYCLOAK_URL,
-    client_id=settings.KEYCLOAK_CLIENT_ID,
-    realm_name=settings.KEYCLOAK_REALM,
-    client_secret_key=settings.KEYCLOAK_CLIENT_SECRET,
-)
-
 cookie_scheme = APIKeyCookie(name="access_token", auto_error=False)
 refresh_cookie_scheme = APIKeyCookie(name="refresh_token", auto_error=False)
 
@@ -31,6 +32,75 @@ oauth2_scheme = OAuth2PasswordBearer(
 
 secret_key_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Stored hash each secret key already matched with a bcrypt check, keyed by
+# shop and SHA-256 digest of the key.
+verified_secret_keys = TTLCache(
+    maxsize=settings.SECRET_KEY_CACHE_SIZE, ttl=settings.SECRET_KEY_CACHE_TTL
+)
+
+# Claims of already verified access tokens, and the user info built from them,
+# keyed by the token digest. Entries never outlive the token.
+verified_tokens = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL
+)
+token_users = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL
+)
+
+jwks_cache = JWKSCache(
+    f"{settings.KEYCLOAK_URL}/realms/{quote(settings.KEYCLOAK_REALM)}/protocol/openid-connect/certs",
+    ttl=settings.JWKS_CACHE_TTL,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL,
+)
+
+
+def get_secret_key_prefix(secret_key: str) -> str:
+    """Get the non-secret prefix stored next to a secret key hash.
+
+    Args:
+        secret_key (str): The plain secret key.
+
+    Returns:
+        str: The prefix, e.g. `abc...xyz`.
+    """
+    return secret_key[:3] + "..." + secret_key[-3:]
+
+
+def valid_metrics_token(token: str = Depends(oauth2_scheme)) -> None:
+    """Require `METRICS_TOKEN` as bearer token."""
+    if not token or not secrets.compare_digest(
+        token.encode(), (settings.METRICS_TOKEN or "").encode()
+    ):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_cache_ttl(token_data: dict, max_ttl: float) -> float:
+    """Get how long data derived from a token can be cached.
+
+    Args:
+        token_data (dict): Decoded token claims.
+        max_ttl (float): Upper bound in seconds.
+
+    Returns:
+        float: Seconds until the token expires, at most `max_ttl`.
+    """
+    expires_at = token_data.get("exp")
+    if expires_at is None:
+        return max_ttl
+    return max(min(max_ttl, expires_at - time.time()), 0)
+
+
+def forget_access_token(access_token: Optional[str]) -> None:
+    """Drop the cached claims and user info of an access token (on logout)."""
+    if access_token:
+        digest = token_digest(access_token)
+        verified_tokens.pop(digest)
+        token_users.pop(digest)
+
 
 class TokenAccessChecker:
     """Class to check the validity of the access token."""
@@ -50,11 +120,13 @@ class TokenAccessChecker:
             if refresh_token and not access_token:
                 raise HTTPException(status_code=403, detail="Not authenticated")
 
-            jwks_url = f"{settings.KEYCLOAK_URL}/realms/{quote(settings.KEYCLOAK_REALM)}/protocol/openid-connect/certs"
-            jwks_client = PyJWKClient(jwks_url, timeout=10)
+            digest = token_digest(access_token)
+            decoded_token = verified_tokens.get(digest)
+            if decoded_token is not None:
+                return decoded_token
 
             try:
-                signing_key = jwks_client.get_signing_key_from_jwt(access_token)
+                signing_key = jwks_cache.get_signing_key_from_jwt(access_token)
 
                 decoded_token = decode(
                     access_token,
@@ -63,11 +135,16 @@ class TokenAccessChecker:
                     audience=["account"],
                     options={"verify_exp": True},
                 )
+                verified_tokens.set(
+                    digest,
+                    decoded_token,
+                    ttl=token_cache_ttl(decoded_token, settings.TOKEN_CACHE_TTL),
+                )
 
                 return decoded_token
             except ExpiredSignatureError:
                 raise HTTPException(status_code=403, detail="Token expired")
-            except InvalidTokenError:
+            except (InvalidTokenError, PyJWKClientError):
                 raise HTTPException(status_code=401, detail="Not authenticated")
         except HTTPException as e:
             if self.auto_error:
@@ -79,21 +156,40 @@ class SecretKeyAccessChecker:
     def __init__(self, auto_error: Optional[bool] = True):
         self.auto_error = auto_error
 
-    async def __call__(self, secret_key: str = Depends(oauth2_scheme)):
+    async def __call__(
+        self, secret_key: str = Depends(oauth2_scheme), shop_db=Depends(get_db)
+    ):
         try:
             if not secret_key:
                 raise HTTPException(status_code=401, detail="Not authenticated")
 
-            allowed_secret_keys = [settings.SECRET_KEY]
-            client_assigned_secret_keys = await SecretKeyValue.prisma().find_many()
-
-            if client_assigned_secret_keys:
-                allowed_secret_keys += [
-                    key.secret_key for key in client_assigned_secret_keys
-                ]
+            digest = tenant_key(hashlib.sha256(secret_key.encode()).hexdigest())
+            verified_hash = verified_secret_keys.get(digest)
+            if verified_hash == settings.SECRET_KEY:
+                return True
+
+            # Only keys sharing the prefix can match, so a single bcrypt check
+            # runs unless two stored keys happen to share a prefix. The lookup
+            # runs even for verified keys, so deleted or disabled keys are
+            # rejected at once by every worker.
+            client_assigned_secret_keys = await SecretKeyValue.prisma(shop_db).find_many(
+                where={"prefix": get_secret_key_prefix(secret_key), "enabled": True}
+            )
+            allowed_secret_keys = [
+                key.secret_key for key in client_assigned_secret_keys
+            ] + [settings.SECRET_KEY]
+
+            if verified_hash in allowed_secret_keys:
+                return True
 
             for key in allowed_secret_keys:
-                if secret_key_context.verify(secret_key, key):
+                with SECRET_KEY_VERIFY_LATENCY.time():
+                    verified = await run_in_threadpool(
+                        secret_key_context.verify, secret_key, key
+                    )
+
+                if verified:
+                    verified_secret_keys.set(digest, key)
                     return True
 
             raise HTTPException(status_code=403, detail="Unauthorized access")
@@ -119,8 +215,14 @@ async def has_customer_session(
 
 
 async def get_current_user(
-    token_data: Annotated[dict, Depends(valid_access_token)]
+    token_data: Annotated[dict, Depends(valid_access_token)],
+    access_token: Annotated[str, Depends(cookie_scheme)],
 ) -> UserTokenInfo:
+    digest = token_digest(access_token)
+    user = token_users.get(digest)
+    if user is not None:
+        return user
+
     try:
         user_info = {
             "username": token_data.get("preferred_username"),
@@ -128,6 +230,10 @@ async def get_current_user(
             "firstName": token_data.get("given_name"),
             "lastName": token_data.get("family_name"),
         }
-        return UserTokenInfo(**user_info)
+        user = UserTokenInfo(**user_info)
+        token_users.set(
+            digest, user, ttl=token_cache_ttl(token_data, settings.TOKEN_CACHE_TTL)
+        )
+        return user
     except KeyError:
         raise HTTPException(status_code=400, detail="Invalid token structure")
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from jwt import PyJWK, PyJWKClient, PyJWKSet, get_unverified_header
+from jwt.exceptions import PyJWKClientError, PyJWTError
+
+from app.core.metrics import JWKS_FETCH_LATENCY
+
+
+class JWKSCache:
+    """Process-wide store of the realm signing keys, indexed by `kid`.
+
+    Keys are refreshed in the background every `ttl` seconds. An unknown `kid`
+    triggers at most one refetch per `min_refresh_interval`, and the last known
+    keys keep being served while the JWKS endpoint is unreachable.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        ttl: int = 300,
+        min_refresh_interval: int = 30,
+        timeout: int = 10,
+    ):
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._client = PyJWKClient(jwks_url, cache_jwk_set=False, timeout=timeout)
+        self._keys: dict[str, PyJWK] = {}
+        self._last_attempt: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Fetch the signing keys from the JWKS endpoint.
+
+        Args:
+            force (bool, optional): Skip the refetch rate limit. Defaults to False.
+
+        Returns:
+            bool: Whether the cached keys were replaced.
+        """
+        with self._refresh_lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._last_attempt is not None
+                and now - self._last_attempt < self.min_refresh_interval
+            ):
+                return False
+            self._last_attempt = now
+
+            try:
+                signing_keys = self._client.get_signing_keys(refresh=True)
+            except PyJWTError:
+                JWKS_FETCH_LATENCY.labels("error").observe(time.monotonic() - now)
+                return False
+
+            JWKS_FETCH_LATENCY.labels("success").observe(time.monotonic() - now)
+
+            self._keys = {key.key_id: key for key in signing_keys}
+            return True
+
+    def load(self, jwks: dict) -> None:
+        """Replace the cached keys with the signing keys of a JWKS document.
+
+        Args:
+            jwks (dict): JWKS document, as served by the certs endpoint.
+        """
+        self._keys = {
+            key.key_id: key
+            for key in PyJWKSet.from_dict(jwks).keys
+            if key.key_id and key.public_key_use in ("sig", None)
+        }
+
+    @property
+    def has_keys(self) -> bool:
+        """Whether signing keys have been loaded."""
+        return bool(self._keys)
+
+    def get_signing_key(self, kid: str) -> PyJWK:
+        """Get the signing key for a `kid`, refetching once if it is unknown.
+
+        Args:
+            kid (str): Key ID from the token header.
+
+        Raises:
+            PyJWKClientError: If no signing key matches the `kid`.
+
+        Returns:
+            PyJWK: The matching signing key.
+        """
+        signing_key = self._keys.get(kid)
+
+        if signing_key is None:
+            self.refresh()
+            signing_key = self._keys.get(kid)
+
+        if signing_key is None:
+            raise PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+
+        return signing_key
+
+    def get_signing_key_from_jwt(self, token: str) -> PyJWK:
+        """Get the signing key for the `kid` in an (unverified) token header.
+
+        Args:
+            token (str): Encoded JWT.
+
+        Returns:
+            PyJWK: The matching signing key.
+        """
+        return self.get_signing_key(get_unverified_header(token).get("kid"))
+
+    async def _refresh_periodically(self):
+        # Keys prefetched during startup are fresh, so wait a full TTL first.
+        if self._keys:
+            await asyncio.sleep(self.ttl)
+
+        while True:
+            await asyncio.to_thread(self.refresh, True)
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        """Start the background refresh task on the running event loop.
+        Refreshes right away unless keys are already loaded."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self):
+        """Cancel the background refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,7 +1,7 @@
 import secrets
 from typing import Tuple
 
-from app.core.security import secret_key_context
+from app.core.security import get_secret_key_prefix, secret_key_context
 
 
 def generate_secret_key() -> Tuple[str, str, str]:
@@ -13,6 +13,6 @@ def generate_secret_key() -> Tuple[str, str, str]:
     """
     secret_key = secrets.token_urlsafe(32)
     hashed_secret_key = secret_key_context.hash(secret_key)
-    prefix = secret_key[:3] + "..." + secret_key[-3:]
+    prefix = get_secret_key_prefix(secret_key)
 
     return secret_key, hashed_secret_key, prefix
@@ -0,0 +1,32 @@
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+def json_response(
+    adapter: TypeAdapter,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[dict] = None,
+    include: Optional[dict] = None,
+) -> Response:
+    """Serialize a response with a precompiled schema, bypassing `jsonable_encoder`.
+
+    Args:
+        adapter (TypeAdapter): Response schema.
+        content (Any): Data matching the schema (dicts or models).
+        status_code (int, optional): Response status code. Defaults to 200.
+        headers (Optional[dict]): Extra response headers.
+        include (Optional[dict]): Only serialize these fields (pydantic
+            `include` syntax).
+
+    Returns:
+        Response: JSON response.
+    """
+    return Response(
+        content=adapter.dump_json(content, include=include),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Awaitable, Optional
+
+from app.config import settings
+from app.core.security import jwks_cache
+from app.database import db, read_db, tenant_pool
+from app.routes.categories.utils import categories_cache
+from app.routes.products.utils import count_products
+
+
+class Warmup:
+    """Startup phase run by the lifespan before the first request.
+
+    Connects the database, prefetches the JWKS signing keys and primes the
+    catalog caches concurrently, so the first requests do not pay for them.
+    Only the database connection is required: other steps that fail or take
+    longer than `timeout` seconds are left to the first request that needs
+    them.
+    """
+
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+        self.done = False
+        self.steps: dict[str, bool] = {}
+        self.durations: dict[str, float] = {}
+
+    async def _step(self, name: str, step: Awaitable, required: bool = False) -> bool:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(step, None if required else self.timeout)
+            self.steps[name] = result is not False
+        except Exception as e:
+            if required:
+                raise
+            print(f"Warm-up step {name} failed: {e!r}")
+            self.steps[name] = False
+        finally:
+            self.durations[name] = time.perf_counter() - start
+
+        return self.steps[name]
+
+    async def _connect_databases(self):
+        if settings.TENANCY_MODE != "single":
+            tenant_pool.start()
+            return
+
+        await asyncio.gather(
+            db.connect(),
+            *([read_db.connect()] if read_db is not None else []),
+        )
+
+    async def _prime_catalog(self):
+        await asyncio.gather(
+            categories_cache.refresh(db), count_products(db, None, "exact")
+        )
+
+    async def _database_and_catalog(self):
+        await self._step("database", self._connect_databases(), required=True)
+
+        # Shops connect on demand in multi-tenant mode, so there is no
+        # catalog to prime yet.
+        if settings.TENANCY_MODE == "single":
+            await self._step("catalog", self._prime_catalog())
+
+    async def run(self) -> None:
+        """Run every warm-up step.
+
+        Raises:
+            Exception: If the database cannot be connected.
+        """
+        await asyncio.gather(
+            self._database_and_catalog(),
+            self._step("jwks", asyncio.to_thread(jwks_cache.refresh, True)),
+        )
+        self.done = True
+        print(
+            "Warm-up finished: "
+            + ", ".join(
+                f"{name} {'ok' if ok else 'failed'} ({self.durations[name]:.2f}s)"
+                for name, ok in self.steps.items()
+            )
+        )
+
+    async def readiness(self) -> tuple[bool, dict[str, Optional[bool]]]:
+        """Check whether the instance can serve traffic.
+
+        Returns:
+            tuple[bool, dict[str, Optional[bool]]]: Whether it is ready (warm-up
+                finished and database reachable), and the result of each
+                check (None when not applicable).
+        """
+        database = None
+        if self.done and settings.TENANCY_MODE == "single":
+            try:
+                await asyncio.wait_for(db.query_raw("SELECT 1"), 2)
+                database = True
+            except Exception:
+                database = False
+
+        checks = {
+            "warmup": self.done,
+            "database": database,
+            "jwks": jwks_cache.has_keys,
+            "catalog": self.steps.get("catalog"),
+        }
+        return self.done and database is not False, checks
+
+
+warmup = Warmup(timeout=settings.STARTUP_WARMUP_TIMEOUT)
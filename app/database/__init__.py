@@ -1,7 +1,118 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, Request
 from prisma.client import Prisma
 
+from app.config import settings
+from app.database.routing import reads_from_primary
+from app.database.tenancy import TenantClientPool, current_tenant
+
 db = Prisma(auto_register=True)
 
+# Read-only client of the replica, for reads that tolerate replication lag.
+# Replicas are only supported in single tenant mode.
+read_db = (
+    Prisma(datasource={"url": settings.DATABASE_READ_URL})
+    if settings.DATABASE_READ_URL and settings.TENANCY_MODE == "single"
+    else None
+)
+
+# Per-shop clients, used instead of `db` when `TENANCY_MODE` is not `single`.
+tenant_pool = TenantClientPool(
+    settings.TENANT_DATABASE_URL_TEMPLATE or settings.DATABASE_URL,
+    maxsize=settings.TENANT_POOL_SIZE,
+    idle_timeout=settings.TENANT_IDLE_TIMEOUT,
+    connection_limit=settings.TENANT_CONNECTION_LIMIT,
+)
+
+
+def get_current_tenant() -> Optional[str]:
+    """Get the shop of the current request (None in single tenant mode)."""
+    return current_tenant.get()
+
+
+def connected_tenants() -> list[Optional[str]]:
+    """Get the shops whose database client is connected ([None] in single
+    tenant mode)."""
+    if settings.TENANCY_MODE == "single":
+        return [None]
+    return [tenant for tenant, _ in tenant_pool.connected()]
+
+
+@asynccontextmanager
+async def use_db(tenant: Optional[str]) -> AsyncIterator[Prisma]:
+    """Work on the database of a shop outside of a request, e.g. in
+    background tasks and commands.
+
+    Args:
+        tenant (Optional[str]): Tenant id (None in single tenant mode).
+
+    Yields:
+        Prisma: Connected client of the shop, with `current_tenant` set.
+    """
+    if settings.TENANCY_MODE != "single" and tenant is None:
+        raise ValueError("A shop is required unless TENANCY_MODE is single")
+
+    token = current_tenant.set(tenant)
+    try:
+        async with primary_client(tenant) as client:
+            yield client
+    finally:
+        current_tenant.reset(token)
+
+
+@asynccontextmanager
+async def use_read_db(
+    tenant: Optional[str], primary: bool = False
+) -> AsyncIterator[Prisma]:
+    """Like `use_db`, but on the replica when there is one.
+
+    Args:
+        tenant (Optional[str]): Tenant id (None in single tenant mode).
+        primary (bool, optional): Read from the primary anyway, e.g. for a
+            session that just wrote. Defaults to False.
+
+    Yields:
+        Prisma: Connected read client of the shop.
+    """
+    if read_db is not None and not primary:
+        yield read_db
+        return
+
+    async with use_db(tenant) as client:
+        yield client
+
+
+@asynccontextmanager
+async def primary_client(tenant: Optional[str]) -> AsyncIterator[Prisma]:
+    if settings.TENANCY_MODE == "single":
+        yield db
+    else:
+        async with tenant_pool.client(tenant) as client:
+            yield client
+
+
+def get_request_tenant() -> Optional[str]:
+    tenant = current_tenant.get()
+    if settings.TENANCY_MODE != "single" and tenant is None:
+        raise HTTPException(status_code=400, detail="Unknown shop")
+    return tenant
+
 
 async def get_db():
-    yield db
+    async with primary_client(get_request_tenant()) as client:
+        yield client
+
+
+async def get_read_db(request: Request):
+    """Get the client for a read-only endpoint: the replica when there is
+    one, unless the session wrote in the last `READ_YOUR_WRITES_WINDOW`
+    seconds. Otherwise the same client as `get_db`.
+    """
+    if read_db is not None and not reads_from_primary(request):
+        yield read_db
+        return
+
+    async with primary_client(get_request_tenant()) as client:
+        yield client
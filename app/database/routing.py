@@ -0,0 +1,88 @@
+import hashlib
+import math
+import time
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from fastapi import Request
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.database.tenancy import tenant_key
+
+# Set after a write; while it has not expired the session reads from the
+# primary, so it sees its own writes even if the replica lags behind.
+READ_PRIMARY_COOKIE = "read_primary"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Sessions that wrote recently, for clients that do not keep cookies (e.g.
+# scripts using a secret key). Keyed by a digest of their credentials.
+recent_writers = TTLCache(maxsize=4096, ttl=settings.READ_YOUR_WRITES_WINDOW)
+
+
+def session_key(headers: dict[bytes, bytes]) -> Optional[str]:
+    """Identify the session of a request by its credentials.
+
+    Args:
+        headers (dict[bytes, bytes]): Request headers, lowercase names.
+
+    Returns:
+        Optional[str]: Digest of the bearer token or access token cookie, or
+            None for anonymous requests.
+    """
+    credentials = headers.get(b"authorization")
+
+    if credentials is None and b"cookie" in headers:
+        cookie = SimpleCookie()
+        cookie.load(headers[b"cookie"].decode("latin-1"))
+        if "access_token" in cookie:
+            credentials = cookie["access_token"].value.encode()
+
+    if not credentials:
+        return None
+    return tenant_key(hashlib.sha256(credentials).hexdigest())
+
+
+def reads_from_primary(request: Request) -> bool:
+    """Check whether a request belongs to a session that wrote recently."""
+    try:
+        if float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+
+    key = session_key({name: value for name, value in request.headers.raw})
+    return key is not None and recent_writers.get(key) is not None
+
+
+class ReadYourWritesMiddleware:
+    """Pin the sessions that made a successful write to the primary database
+    for `READ_YOUR_WRITES_WINDOW` seconds."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.READ_YOUR_WRITES_WINDOW
+                key = session_key(dict(scope["headers"]))
+                if key is not None:
+                    recent_writers.set(key, True)
+
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}={math.ceil(time.time() + window)}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,218 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from prisma.client import Prisma
+
+from app.config import settings
+
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,62}$")
+
+# Shop of the current request, set by `TenantMiddleware` (None in single
+# tenant mode). Cache keys include it so shops never see each other's data.
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+
+def tenant_key(key: str) -> str:
+    """Prefix a cache key with the shop of the current request, if any."""
+    tenant = current_tenant.get()
+    return key if tenant is None else f"{tenant}:{key}"
+
+
+def resolve_tenant(scope: dict) -> Optional[str]:
+    """Get the shop of a request from the tenant header or the host.
+
+    Args:
+        scope (dict): ASGI connection scope.
+
+    Returns:
+        Optional[str]: The tenant id, or None if it is missing or malformed.
+    """
+    headers = dict(scope.get("headers") or [])
+
+    if settings.TENANCY_MODE == "header":
+        tenant = headers.get(settings.TENANT_HEADER.lower().encode(), b"").decode()
+    else:
+        host = headers.get(b"host", b"").decode().split(":")[0].lower()
+        if settings.TENANT_BASE_DOMAIN:
+            suffix = "." + settings.TENANT_BASE_DOMAIN.lower()
+            tenant = host.removesuffix(suffix) if host.endswith(suffix) else ""
+        else:
+            tenant = host.split(".")[0]
+
+    tenant = tenant.strip().lower()
+    return tenant if TENANT_ID_PATTERN.match(tenant) else None
+
+
+class TenantMiddleware:
+    """Resolve the shop of every request into `current_tenant`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        token = current_tenant.set(resolve_tenant(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+def with_connection_limit(url: str, connection_limit: int) -> str:
+    """Set the Prisma `connection_limit` of a database URL, unless it has one."""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.setdefault("connection_limit", str(connection_limit))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class PooledClient:
+    def __init__(self, client: Prisma):
+        self.client = client
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.connect_lock = asyncio.Lock()
+
+
+class TenantClientPool:
+    """LRU pool of per-shop Prisma clients.
+
+    Each Prisma client runs its own query engine, so only the most recently
+    used `maxsize` shops keep one. Clients connect on first use, with at most
+    `connection_limit` database connections each. They are closed after
+    `idle_timeout` seconds without requests, or when a busier shop needs the
+    slot.
+    """
+
+    def __init__(
+        self,
+        url_template: str,
+        maxsize: int = 100,
+        idle_timeout: int = 300,
+        connection_limit: int = 2,
+    ):
+        self.url_template = url_template
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.connection_limit = connection_limit
+        self._clients: OrderedDict[str, PooledClient] = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def database_url(self, tenant: str) -> str:
+        return with_connection_limit(
+            self.url_template.format(tenant=tenant), self.connection_limit
+        )
+
+    @asynccontextmanager
+    async def client(self, tenant: str) -> AsyncIterator[Prisma]:
+        """Borrow the connected client of a shop.
+
+        Args:
+            tenant (str): Tenant id.
+
+        Yields:
+            Prisma: The shop's client. It is not evicted while borrowed.
+        """
+        async with self._lock:
+            entry = self._clients.get(tenant)
+            if entry is None:
+                entry = PooledClient(
+                    Prisma(datasource={"url": self.database_url(tenant)})
+                )
+                self._clients[tenant] = entry
+
+            self._clients.move_to_end(tenant)
+            entry.in_use += 1
+            evicted = self._pop_overflow()
+
+        try:
+            await self._disconnect(evicted)
+
+            if not entry.client.is_connected():
+                async with entry.connect_lock:
+                    if not entry.client.is_connected():
+                        await entry.client.connect()
+
+            yield entry.client
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+
+    def _pop_overflow(self) -> list[PooledClient]:
+        evicted = []
+        for tenant in list(self._clients):
+            if len(self._clients) <= self.maxsize:
+                break
+            if self._clients[tenant].in_use == 0:
+                evicted.append(self._clients.pop(tenant))
+        return evicted
+
+    @staticmethod
+    async def _disconnect(entries: list[PooledClient]) -> None:
+        for entry in entries:
+            async with entry.connect_lock:
+                if entry.client.is_connected():
+                    await entry.client.disconnect()
+
+    def connected(self) -> list[tuple[str, Prisma]]:
+        """Get the shops whose client is currently connected."""
+        return [
+            (tenant, entry.client)
+            for tenant, entry in self._clients.items()
+            if entry.client.is_connected()
+        ]
+
+    async def close_idle(self) -> int:
+        """Close the clients unused for `idle_timeout` seconds.
+
+        Returns:
+            int: Number of closed clients.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+
+        async with self._lock:
+            idle = [
+                tenant
+                for tenant, entry in self._clients.items()
+                if entry.in_use == 0 and entry.last_used <= deadline
+            ]
+            evicted = [self._clients.pop(tenant) for tenant in idle]
+
+        await self._disconnect(evicted)
+        return len(evicted)
+
+    async def _close_idle_periodically(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60))
+            await self.close_idle()
+
+    def start(self):
+        """Start closing idle clients in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._close_idle_periodically())
+
+    async def stop(self):
+        """Stop the background task and close every client."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        async with self._lock:
+            evicted = list(self._clients.values())
+            self._clients.clear()
+
+        await self._disconnect(evicted)
@@ -0,0 +1,27 @@
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+
+class DailySalesResponse(TypedDict):
+    day: str
+    orders: int
+    paid_orders: int
+    revenue: int
+    units: int
+
+
+class OrderStatusCountsResponse(TypedDict):
+    payment: dict[str, int]
+    shipping: dict[str, int]
+
+
+class TopProductResponse(TypedDict):
+    product_id: int
+    name: str
+    units: int
+    orders: int
+
+
+daily_sales_adapter = TypeAdapter(list[DailySalesResponse])
+order_status_counts_adapter = TypeAdapter(OrderStatusCountsResponse)
+top_products_adapter = TypeAdapter(list[TopProductResponse])
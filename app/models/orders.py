@@ -0,0 +1,27 @@
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from prisma.models import orders as Orders
+
+
+class OrdersCancel(BaseModel):
+    order_ids: list[int] = Field(min_length=1, max_length=1000)
+
+
+class OrderItemCreate(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0, le=1000)
+
+
+class OrderCreate(BaseModel):
+    # Only read with a secret key; signed-in customers order for themselves.
+    customer_id: Optional[UUID] = None
+    address_id: Optional[int] = None
+    payment_method: str
+    items: list[OrderItemCreate] = Field(min_length=1, max_length=100)
+
+
+order_list_adapter = TypeAdapter(list[Orders])
+order_adapter = TypeAdapter(Orders)
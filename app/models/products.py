@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Union
+
+from pydantic import BaseModel, Field, TypeAdapter
+from typing_extensions import NotRequired, TypedDict
 
 
 class ProductCreate(BaseModel):
@@ -12,3 +16,69 @@ class ProductCreate(BaseModel):
 
 class ProductUpdateVisibility(BaseModel):
     hidden: bool
+
+
+class ProductBulkUpdateRow(BaseModel):
+    id: int
+    price: Optional[int] = Field(default=None, ge=0)
+    stock: Optional[int] = Field(default=None, ge=0)
+    hidden: Optional[bool] = None
+
+
+class ProductBulkUpdate(BaseModel):
+    products: list[ProductBulkUpdateRow] = Field(min_length=1, max_length=100_000)
+
+
+class ProductCategoryResponse(TypedDict):
+    id: str
+    name: str
+    description: str
+
+
+class ProductHighlightResponse(TypedDict):
+    name: str
+    description: str
+
+
+class ProductListItemResponse(TypedDict):
+    id: int
+    name: str
+    price: int
+    description: str
+    isHidden: bool
+    categories: list[ProductCategoryResponse]
+    thumbnailImg: Optional[str]
+    stock: int
+    createdAt: Union[datetime, str, None]
+    rank: NotRequired[float]
+    highlight: NotRequired[ProductHighlightResponse]
+
+
+class ProductListResponse(TypedDict):
+    products: list[ProductListItemResponse]
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+
+class ProductResponse(TypedDict):
+    id: int
+    name: str
+    price: int
+    description: str
+    categories: list[ProductCategoryResponse]
+    mediafiles: list[str]
+    stock: int
+    createdAt: Union[datetime, str, None]
+    isHidden: bool
+
+
+class ProductBulkUpdateResponse(TypedDict):
+    updated: int
+    missing: int
+    missing_ids: list[int]
+    products: NotRequired[list[ProductListItemResponse]]
+
+
+product_list_adapter = TypeAdapter(ProductListResponse)
+product_adapter = TypeAdapter(ProductResponse)
+product_bulk_update_adapter = TypeAdapter(ProductBulkUpdateResponse)
@@ -0,0 +1,112 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.security import has_admin_role
+from app.core.serialization import json_response
+from app.database import get_read_db as get_shops_read_db
+from app.models.analytics import (
+    daily_sales_adapter,
+    order_status_counts_adapter,
+    top_products_adapter,
+)
+from prisma import Prisma as ShopsClient
+
+router = APIRouter(tags=["analytics"], dependencies=[Depends(has_admin_role)])
+
+MAX_DAILY_RANGE = 366
+
+
+@router.get("/sales/daily", summary="Get orders, revenue and units sold per day")
+async def handle_get_daily_sales(
+    from_date: date = Query(None, alias="from"),
+    to_date: date = Query(None, alias="to"),
+    shop_db: ShopsClient = Depends(get_shops_read_db),
+):
+    to_date = to_date or datetime.now(timezone.utc).date()
+    from_date = from_date or to_date - timedelta(days=29)
+
+    if from_date > to_date or (to_date - from_date).days >= MAX_DAILY_RANGE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The range must span between 1 and {MAX_DAILY_RANGE} days",
+        )
+
+    rows = await shop_db.query_raw(
+        """
+        SELECT to_char(day, 'YYYY-MM-DD') AS day,
+            sum(orders)::bigint AS orders,
+            sum(paid_orders)::bigint AS paid_orders,
+            sum(revenue)::bigint AS revenue,
+            sum(units)::bigint AS units
+        FROM daily_sales_rollups
+        WHERE day BETWEEN $1::date AND $2::date
+        GROUP BY day
+        """,
+        from_date.isoformat(),
+        to_date.isoformat(),
+    )
+    rows_by_day = {row["day"]: row for row in rows}
+
+    span = (to_date - from_date).days + 1
+    days = (from_date + timedelta(days=i) for i in range(span))
+    return json_response(
+        daily_sales_adapter,
+        [
+            rows_by_day.get(
+                day.isoformat(),
+                {
+                    "day": day.isoformat(),
+                    "orders": 0,
+                    "paid_orders": 0,
+                    "revenue": 0,
+                    "units": 0,
+                },
+            )
+            for day in days
+        ],
+    )
+
+
+@router.get("/orders/statuses", summary="Count orders per payment and shipping status")
+async def handle_get_order_statuses(shop_db: ShopsClient = Depends(get_shops_read_db)):
+    rows = await shop_db.query_raw(
+        """
+        SELECT kind, status, sum(orders)::bigint AS orders
+        FROM order_status_rollups
+        GROUP BY kind, status
+        HAVING sum(orders) > 0
+        ORDER BY kind, status
+        """
+    )
+
+    counts = {"payment": {}, "shipping": {}}
+    for row in rows:
+        counts[row["kind"]][row["status"]] = row["orders"]
+
+    return json_response(order_status_counts_adapter, counts)
+
+
+@router.get("/products/top", summary="Get the best selling products by units")
+async def handle_get_top_products(
+    limit: int = Query(10, ge=1, le=100),
+    shop_db: ShopsClient = Depends(get_shops_read_db),
+):
+    rows = await shop_db.query_raw(
+        """
+        SELECT r.product_id, p.name, r.units, r.orders
+        FROM (
+            SELECT product_id, sum(units)::bigint AS units, sum(orders)::bigint AS orders
+            FROM product_sales_rollups
+            GROUP BY product_id
+            HAVING sum(units) > 0
+            ORDER BY units DESC, product_id
+            LIMIT $1
+        ) r
+        JOIN products p ON p.id = r.product_id
+        ORDER BY r.units DESC, r.product_id
+        """,
+        limit,
+    )
+
+    return json_response(top_products_adapter, rows)
@@ -0,0 +1,232 @@
+import random
+from collections import Counter
+from datetime import timedelta
+from typing import Optional
+
+from app.constants import PaymentStatus
+from prisma import Prisma as ShopsClient
+
+ROLLUP_SHARDS = 8
+
+BACKFILL_TIMEOUT = timedelta(minutes=10)
+
+ROLLUP_TABLES = ("daily_sales_rollups", "order_status_rollups", "product_sales_rollups")
+
+# Locks the payment and shipping rows, so concurrent status changes of the
+# same order apply their rollup deltas one after the other.
+LOCK_ORDER_STATES_SQL = """
+    SELECT o.id, to_char(o.ordered_at, 'YYYY-MM-DD') AS day,
+        o.payment_id, p.status AS payment_status, p.amount,
+        o.shipping_id, s.status AS shipping_status
+    FROM orders o
+    JOIN payments p ON p.id = o.payment_id
+    JOIN shipping s ON s.id = o.shipping_id
+    WHERE o.id = ANY(string_to_array($1, ',')::bigint[])
+    ORDER BY o.id
+    FOR UPDATE OF p, s
+"""
+
+ORDER_ITEMS_SQL = """
+    SELECT order_id, product_id, sum(quantity)::int AS quantity
+    FROM order_items
+    WHERE order_id = ANY(string_to_array($1, ',')::bigint[])
+    GROUP BY order_id, product_id
+"""
+
+UPSERT_DAILY_SQL = """
+    INSERT INTO daily_sales_rollups (day, shard, orders, paid_orders, revenue, units)
+    VALUES ($1::date, $2, $3, $4, $5, $6)
+    ON CONFLICT (day, shard) DO UPDATE SET
+        orders = daily_sales_rollups.orders + EXCLUDED.orders,
+        paid_orders = daily_sales_rollups.paid_orders + EXCLUDED.paid_orders,
+        revenue = daily_sales_rollups.revenue + EXCLUDED.revenue,
+        units = daily_sales_rollups.units + EXCLUDED.units
+"""
+
+UPSERT_STATUS_SQL = """
+    INSERT INTO order_status_rollups (kind, status, shard, orders)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (kind, status, shard) DO UPDATE SET
+        orders = order_status_rollups.orders + EXCLUDED.orders
+"""
+
+UPSERT_PRODUCT_SQL = """
+    INSERT INTO product_sales_rollups (product_id, shard, units, orders)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (product_id, shard) DO UPDATE SET
+        units = product_sales_rollups.units + EXCLUDED.units,
+        orders = product_sales_rollups.orders + EXCLUDED.orders
+"""
+
+BACKFILL_SQL = (
+    """
+    INSERT INTO daily_sales_rollups (day, shard, orders, paid_orders, revenue, units)
+    SELECT o.ordered_at::date, 0, count(*),
+        count(*) FILTER (WHERE p.status = '{paid}'),
+        coalesce(sum(p.amount) FILTER (WHERE p.status = '{paid}'), 0),
+        coalesce(sum(i.units) FILTER (WHERE p.status <> '{cancelled}'), 0)
+    FROM orders o
+    JOIN payments p ON p.id = o.payment_id
+    LEFT JOIN (
+        SELECT order_id, sum(quantity) AS units FROM order_items GROUP BY order_id
+    ) i ON i.order_id = o.id
+    WHERE o.ordered_at IS NOT NULL
+    GROUP BY 1
+    """,
+    """
+    INSERT INTO order_status_rollups (kind, status, shard, orders)
+    SELECT 'payment', p.status, 0, count(*)
+    FROM orders o JOIN payments p ON p.id = o.payment_id
+    GROUP BY p.status
+    UNION ALL
+    SELECT 'shipping', s.status, 0, count(*)
+    FROM orders o JOIN shipping s ON s.id = o.shipping_id
+    GROUP BY s.status
+    """,
+    """
+    INSERT INTO product_sales_rollups (product_id, shard, units, orders)
+    SELECT i.product_id, 0, sum(i.quantity), count(DISTINCT i.order_id)
+    FROM order_items i
+    JOIN orders o ON o.id = i.order_id
+    JOIN payments p ON p.id = o.payment_id
+    WHERE p.status <> '{cancelled}'
+    GROUP BY i.product_id
+    """,
+)
+
+
+async def lock_order_states(tx: ShopsClient, order_ids: list[int]) -> list[dict]:
+    """Lock the payment and shipping of orders and read what the rollups count.
+
+    Args:
+        tx (ShopsClient): Transaction client.
+        order_ids (list[int]): Orders to lock.
+
+    Returns:
+        list[dict]: `id`, `day`, `payment_id`, `payment_status`, `amount`,
+            `shipping_id`, `shipping_status` and `items` (quantity per
+            product id) of each existing order.
+    """
+    if not order_ids:
+        return []
+
+    ids = ",".join(str(id_) for id_ in order_ids)
+    states = await tx.query_raw(LOCK_ORDER_STATES_SQL, ids)
+
+    items: dict[int, dict[int, int]] = {}
+    for row in await tx.query_raw(ORDER_ITEMS_SQL, ids):
+        items.setdefault(row["order_id"], {})[row["product_id"]] = row["quantity"]
+
+    return [{**state, "items": items.get(state["id"], {})} for state in states]
+
+
+def with_statuses(
+    state: dict,
+    payment_status: Optional[str] = None,
+    shipping_status: Optional[str] = None,
+) -> dict:
+    """Copy an order state with new statuses (None keeps the current one)."""
+    return {
+        **state,
+        "payment_status": payment_status or state["payment_status"],
+        "shipping_status": shipping_status or state["shipping_status"],
+    }
+
+
+def order_contribution(
+    state: dict, sign: int, daily: dict, statuses: Counter, products: dict
+):
+    """Add (`sign=1`) or remove (`sign=-1`) what an order counts in each rollup."""
+    cancelled = state["payment_status"] == PaymentStatus.CANCELLED
+    paid = state["payment_status"] == PaymentStatus.SUCCESS
+
+    if state["day"]:
+        totals = daily.setdefault(state["day"], Counter())
+        totals["orders"] += sign
+        totals["paid_orders"] += sign * paid
+        totals["revenue"] += sign * paid * state["amount"]
+        totals["units"] += sign * (not cancelled) * sum(state["items"].values())
+
+    statuses[("payment", state["payment_status"])] += sign
+    statuses[("shipping", state["shipping_status"])] += sign
+
+    if not cancelled:
+        for product_id, quantity in state["items"].items():
+            totals = products.setdefault(product_id, Counter())
+            totals["units"] += sign * quantity
+            totals["orders"] += sign
+
+
+async def apply_rollup_changes(
+    tx: ShopsClient, before: list[dict], after: list[dict]
+) -> None:
+    """Update the rollups with the difference between two sets of order states.
+
+    Must run in the transaction that changes the orders. Rows are upserted in
+    a fixed order (day, status, product id) within one random shard, so
+    concurrent writers cannot deadlock.
+
+    Args:
+        tx (ShopsClient): Transaction client.
+        before (list[dict]): States before the change (empty for new orders).
+        after (list[dict]): States after the change.
+    """
+    daily: dict[str, Counter] = {}
+    statuses: Counter = Counter()
+    products: dict[int, Counter] = {}
+
+    for state in before:
+        order_contribution(state, -1, daily, statuses, products)
+    for state in after:
+        order_contribution(state, 1, daily, statuses, products)
+
+    shard = random.randrange(ROLLUP_SHARDS)
+
+    for day in sorted(daily):
+        totals = daily[day]
+        if any(totals.values()):
+            await tx.execute_raw(
+                UPSERT_DAILY_SQL,
+                day,
+                shard,
+                totals["orders"],
+                totals["paid_orders"],
+                totals["revenue"],
+                totals["units"],
+            )
+
+    for (kind, status), delta in sorted(statuses.items()):
+        if delta:
+            await tx.execute_raw(UPSERT_STATUS_SQL, kind, status, shard, delta)
+
+    for product_id in sorted(products):
+        totals = products[product_id]
+        if any(totals.values()):
+            await tx.execute_raw(
+                UPSERT_PRODUCT_SQL, product_id, shard, totals["units"], totals["orders"]
+            )
+
+
+async def backfill_rollups(shop_db: ShopsClient) -> None:
+    """Rebuild every rollup from the orders.
+
+    The rollup tables stay locked against incremental updates until the
+    rebuild commits, so orders changing meanwhile are counted exactly once.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+    """
+    async with shop_db.tx(timeout=BACKFILL_TIMEOUT) as tx:
+        await tx.execute_raw(
+            f"LOCK TABLE {', '.join(ROLLUP_TABLES)} IN EXCLUSIVE MODE"
+        )
+
+        for table in ROLLUP_TABLES:
+            await tx.execute_raw(f"DELETE FROM {table}")
+
+        for statement in BACKFILL_SQL:
+            await tx.execute_raw(
+                statement.format(
+                    paid=PaymentStatus.SUCCESS, cancelled=PaymentStatus.CANCELLED
+                )
+            )
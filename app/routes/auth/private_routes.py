@@ -1,8 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from app.core.security import get_current_user, keycloak_openid, valid_access_token
+from app.config import settings
+from app.core.security import (
+    cookie_scheme,
+    forget_access_token,
+    get_current_user,
+    token_cache_ttl,
+    valid_access_token,
+)
 from app.database import get_db as get_shops_db
 from app.models.user import UserTokenInfo
+from app.routes.customers.utils import get_customer_by_email
+from app.services.keycloak import KeycloakClient, KeycloakError, get_keycloak
 from prisma import Prisma
 
 router = APIRouter(tags=["auth"], dependencies=[Depends(valid_access_token)])
@@ -14,9 +23,14 @@ router = APIRouter(tags=["auth"], dependencies=[Depends(valid_access_token)])
 )
 async def get_logged_user(
     user: UserTokenInfo = Depends(get_current_user),
+    token_data: dict = Depends(valid_access_token),
     client_db: Prisma = Depends(get_shops_db),
 ):
-    user_info = await client_db.customers.find_unique({"email": user.email})
+    user_info = await get_customer_by_email(
+        client_db,
+        user.email,
+        ttl=token_cache_ttl(token_data, settings.CUSTOMER_CACHE_TTL),
+    )
 
     if not user_info:
         raise HTTPException(status_code=404, detail="User not found")
@@ -28,14 +42,17 @@ async def get_logged_user(
 async def logout(
     request: Request,
     response: Response,
+    access_token: str = Depends(cookie_scheme),
+    keycloak: KeycloakClient = Depends(get_keycloak),
 ):
     refresh_token = request.cookies.get("refresh_token")
 
     try:
-        keycloak_openid.logout(refresh_token)
-    except Exception as e:
+        await keycloak.logout(refresh_token)
+    except KeycloakError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    forget_access_token(access_token)
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
 
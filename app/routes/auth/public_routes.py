@@ -1,10 +1,10 @@
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse, RedirectResponse
 
 from app.config import settings
-from app.core.security import keycloak_openid
+from app.services.keycloak import KeycloakClient, KeycloakError, get_keycloak
 
 router = APIRouter()
 
@@ -35,7 +35,11 @@ async def redirect_to_keycloak(
     tags=["auth"],
 )
 async def authorize(
-    request: Request, code: str = None, validation_uri: str = None, next: str = None
+    request: Request,
+    code: str = None,
+    validation_uri: str = None,
+    next: str = None,
+    keycloak: KeycloakClient = Depends(get_keycloak),
 ):
     if not code:
         raise HTTPException(
@@ -50,10 +54,10 @@ async def authorize(
         validation_uri += f"?next={next}"
 
     try:
-        token_response = keycloak_openid.token(
+        token_response = await keycloak.token(
             grant_type="authorization_code", code=code, redirect_uri=validation_uri
         )
-    except Exception as e:
+    except KeycloakError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     response = JSONResponse(content=token_response)
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Request, Response
 
 from app.database import get_db as get_shops_db
 from app.models.categories import CategoryCreate
+from app.routes.categories.utils import categories_cache, etag_matches
 from prisma import Prisma as ShopsClient
 
 router = APIRouter(tags=["categories"])
 
 
 @router.get("/categories", summary="Get all categories")
-async def handle_get_categories(shop_db: ShopsClient = Depends(get_shops_db)):
-    categories = await shop_db.categories.find_many()
+async def handle_get_categories(
+    request: Request, shop_db: ShopsClient = Depends(get_shops_db)
+):
+    body, etag = await categories_cache.get(shop_db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
 
-    return categories
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/categories", summary="Create a new category")
@@ -19,6 +26,7 @@ async def handle_post_categories(
     data: CategoryCreate, shop_db: ShopsClient = Depends(get_shops_db)
 ):
     new_category = await shop_db.categories.create(data=data.model_dump())
+    await categories_cache.refresh(shop_db)
 
     return new_category
 
@@ -32,4 +40,6 @@ async def handle_delete_category(
     if res is None:
         return Response(status_code=404)
 
+    await categories_cache.refresh(shop_db)
+
     return Response(status_code=204)
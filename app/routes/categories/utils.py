@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import time
+from typing import Optional
+
+import orjson
+
+from app.config import settings
+from app.database.tenancy import current_tenant
+from prisma import Prisma as ShopsClient
+
+
+class CategoriesCache:
+    """Process-local copy of the serialized categories list and its ETag,
+    per shop.
+
+    The category write handlers rebuild it, so reads never reach the database
+    once it is loaded. Only the process handling a write rebuilds its copy, so
+    the TTL bounds how long other workers serve an outdated list.
+    """
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl
+        # (body, etag, loaded at) per shop, None in single tenant mode.
+        self._entries: dict[Optional[str], tuple[bytes, str, float]] = {}
+        self._locks: dict[Optional[str], asyncio.Lock] = {}
+
+    def is_fresh(self) -> bool:
+        entry = self._entries.get(current_tenant.get())
+        if entry is None:
+            return False
+        return self.ttl is None or time.monotonic() - entry[2] < self.ttl
+
+    def _lock(self) -> asyncio.Lock:
+        return self._locks.setdefault(current_tenant.get(), asyncio.Lock())
+
+    async def get(self, shop_db: ShopsClient) -> tuple[bytes, str]:
+        """Get the serialized categories and their ETag, loading them if needed.
+
+        Args:
+            shop_db (ShopsClient): Database client of the current shop.
+
+        Returns:
+            tuple[bytes, str]: JSON body and strong ETag.
+        """
+        if not self.is_fresh():
+            async with self._lock():
+                if not self.is_fresh():
+                    await self._load(shop_db)
+
+        body, etag, _ = self._entries[current_tenant.get()]
+        return body, etag
+
+    async def refresh(self, shop_db: ShopsClient) -> None:
+        """Rebuild the cache from the database. Called after every write.
+
+        Args:
+            shop_db (ShopsClient): Database client of the current shop.
+        """
+        async with self._lock():
+            await self._load(shop_db)
+
+    def clear(self) -> None:
+        """Forget the categories of every shop."""
+        self._entries.clear()
+
+    async def _load(self, shop_db: ShopsClient) -> None:
+        categories = await shop_db.categories.find_many()
+
+        body = orjson.dumps([c.model_dump() for c in categories])
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._entries[current_tenant.get()] = (body, etag, time.monotonic())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an `If-None-Match` header against an ETag (weak comparison).
+
+    Args:
+        if_none_match (Optional[str]): Header value sent by the client.
+        etag (str): Current ETag.
+
+    Returns:
+        bool: Whether the client copy is still current.
+    """
+    if not if_none_match:
+        return False
+
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+categories_cache = CategoriesCache(ttl=settings.CATEGORIES_CACHE_TTL)
@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
-from app.database import get_db as get_shops_db
+from app.core.pagination import (
+    decode_datetime_cursor,
+    encode_cursor,
+    keyset_after_desc,
+)
+from app.database import get_read_db as get_shops_read_db
 from prisma import Prisma as ShopsClient
 
 router = APIRouter(tags=["customers"])
@@ -8,14 +13,27 @@ router = APIRouter(tags=["customers"])
 
 @router.get("/", summary="Get all customers")
 async def handle_get_customers(
-    shop_db: ShopsClient = Depends(get_shops_db),
+    response: Response,
+    shop_db: ShopsClient = Depends(get_shops_read_db),
     limit: int = 20,
     offset: int = 0,
+    cursor: str = None,
 ):
+    where = None
+    if cursor:
+        created_at, customer_id = decode_datetime_cursor(cursor, str)
+        where = keyset_after_desc("created_at", created_at, customer_id)
+
     data = await shop_db.customers.find_many(
+        where=where,
         take=limit,
-        skip=offset,
-        order={"created_at": "desc"},
+        skip=None if cursor else offset,
+        order=[{"created_at": "desc"}, {"id": "desc"}],
     )
 
+    if data and len(data) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            data[-1].created_at, data[-1].id
+        )
+
     return data
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.database.tenancy import tenant_key
+from prisma import Prisma as ShopsClient
+from prisma.models import customers as Customers
+
+# Customer rows of signed-in users, keyed by shop and email.
+customers_cache = TTLCache(
+    maxsize=settings.CUSTOMER_CACHE_SIZE, ttl=settings.CUSTOMER_CACHE_TTL
+)
+
+
+async def get_customer_by_email(
+    shop_db: ShopsClient, email: str, ttl: Optional[float] = None
+) -> Optional[Customers]:
+    """Get a customer by email, from the cache when possible.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        email (str): Customer email.
+        ttl (Optional[float]): Lifetime of a new cache entry, e.g. the time
+            left before the token that asked for it expires. Capped by
+            `CUSTOMER_CACHE_TTL`.
+
+    Returns:
+        Optional[customers]: The customer, or None if there is none.
+    """
+    key = tenant_key(email)
+    customer = customers_cache.get(key)
+
+    if customer is None:
+        customer = await shop_db.customers.find_unique({"email": email})
+
+        if customer is not None:
+            max_ttl = settings.CUSTOMER_CACHE_TTL
+            customers_cache.set(
+                key, customer, ttl=max_ttl if ttl is None else min(ttl, max_ttl)
+            )
+
+    return customer
+
+
+def invalidate_customer(email: Optional[str] = None) -> None:
+    """Drop a cached customer. Call it after every change to a customer.
+
+    Args:
+        email (Optional[str]): Email of the customer (before the change).
+            Clears every entry if omitted.
+    """
+    if email is None:
+        customers_cache.clear()
+    else:
+        customers_cache.pop(tenant_key(email))
@@ -1,7 +1,42 @@
-from fastapi import APIRouter, Depends, Response
+from datetime import datetime
+from typing import Literal, Optional, Union
 
-from app.constants import PaymentStatus, ShippingStatus
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.core.pagination import (
+    decode_datetime_cursor,
+    encode_cursor,
+    keyset_after_desc,
+)
+from app.core.security import (
+    has_admin_role_without_error,
+    valid_access_token_without_error,
+)
+from app.core.serialization import json_response
 from app.database import get_db as get_shops_db
+from app.database import get_read_db as get_shops_read_db
+from app.database import get_request_tenant
+from app.database.routing import reads_from_primary
+from app.models.orders import (
+    OrderCreate,
+    OrdersCancel,
+    order_adapter,
+    order_list_adapter,
+)
+from app.routes.orders.checkout import (
+    confirm_order,
+    create_order,
+    get_checkout_customer,
+)
+from app.routes.orders.export import (
+    iter_order_batches,
+    iter_orders_csv,
+    iter_orders_ndjson,
+)
+from app.routes.orders.fields import order_projection
+from app.routes.orders.utils import cancel_orders
 from prisma import Prisma as ShopsClient
 
 router = APIRouter(tags=["orders"])
@@ -9,62 +44,157 @@ router = APIRouter(tags=["orders"])
 
 @router.get("/", summary="Get all orders")
 async def handle_get_orders(
-    shop_db: ShopsClient = Depends(get_shops_db),
+    shop_db: ShopsClient = Depends(get_shops_read_db),
     limit: int = 20,
     offset: int = 0,
+    cursor: str = None,
+    fields: str = None,
+    expand: str = None,
 ):
+    include, projection = order_projection(
+        fields, expand, default_expand=("payments", "shipping")
+    )
+
+    where = None
+    if cursor:
+        ordered_at, order_id = decode_datetime_cursor(cursor, int)
+        where = keyset_after_desc("ordered_at", ordered_at, order_id)
+
     data = await shop_db.orders.find_many(
+        where=where,
         take=limit,
-        skip=offset,
-        order={"ordered_at": "desc"},
-        include={"payments": True, "shipping": True},
+        skip=None if cursor else offset,
+        order=[{"ordered_at": "desc"}, {"id": "desc"}],
+        include=include,
+    )
+
+    headers = None
+    if data and len(data) == limit:
+        headers = {"X-Next-Cursor": encode_cursor(data[-1].ordered_at, data[-1].id)}
+
+    return json_response(
+        order_list_adapter, data, headers=headers, include={"__all__": projection}
+    )
+
+
+@router.post("/", summary="Create an order (checkout)")
+async def handle_create_order(
+    data: OrderCreate,
+    shop_db: ShopsClient = Depends(get_shops_db),
+    token_data: Union[dict, bool] = Depends(valid_access_token_without_error),
+    admin: bool = Depends(has_admin_role_without_error),
+):
+    customer = await get_checkout_customer(shop_db, data, token_data, admin)
+
+    address_id = data.address_id or customer.default_address_id
+
+    if address_id is None or not await shop_db.addresses.find_unique(
+        where={"id": address_id}
+    ):
+        raise HTTPException(status_code=400, detail="Invalid shipping address")
+
+    order = await create_order(shop_db, data, customer.id, address_id)
+
+    return json_response(order_adapter, order, status_code=201)
+
+
+@router.get("/export", summary="Export orders as NDJSON or CSV")
+async def handle_export_orders(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    from_date: datetime = Query(None, alias="from"),
+    to_date: datetime = Query(None, alias="to"),
+    tenant: Optional[str] = Depends(get_request_tenant),
+):
+    # The body streams after the request's dependencies are released, so
+    # the batches are read with a client borrowed for the whole export.
+    batches = iter_order_batches(
+        tenant,
+        from_date,
+        to_date,
+        settings.ORDERS_EXPORT_BATCH_SIZE,
+        primary=reads_from_primary(request),
     )
 
-    return data
+    if format == "csv":
+        return StreamingResponse(
+            iter_orders_csv(batches),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="orders.csv"'},
+        )
+
+    return StreamingResponse(
+        iter_orders_ndjson(batches),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="orders.ndjson"'},
+    )
 
 
 @router.get("/{order_id}")
 async def handle_get_order(
     order_id: int,
-    shop_db: ShopsClient = Depends(get_shops_db),
+    shop_db: ShopsClient = Depends(get_shops_read_db),
+    fields: str = None,
+    expand: str = None,
 ):
-    order = await shop_db.orders.find_unique(
-        where={"id": order_id},
-        include={
-            "payments": True,
-            "shipping": {
-                "include": {
-                    "addresses": True,
-                }
-            },
-            "customers": True,
-        },
+    include, projection = order_projection(
+        fields, expand, default_expand=("payments", "shipping.addresses", "customers")
     )
 
+    order = await shop_db.orders.find_unique(where={"id": order_id}, include=include)
+
     if not order:
         return Response(status_code=404)
 
-    return order
+    return json_response(order_adapter, order, include=projection)
 
 
-@router.patch("/{order_id}/cancel")
-async def handle_cancel_order(
+@router.post("/{order_id}/confirm", summary="Confirm the payment of an order")
+async def handle_confirm_order(
     order_id: int,
     shop_db: ShopsClient = Depends(get_shops_db),
+    admin: bool = Depends(has_admin_role_without_error),
 ):
+    # Payments are confirmed by the shop backend, never by the buyer.
+    if not admin:
+        raise HTTPException(status_code=403, detail="Unauthorized access")
+
     order = await shop_db.orders.find_unique(where={"id": order_id})
 
     if not order:
         return Response(status_code=404)
 
-    await shop_db.payments.update(
-        where={"id": order.payment_id},
-        data={"status": PaymentStatus.CANCELLED},
-    )
+    if not await confirm_order(shop_db, order):
+        raise HTTPException(
+            status_code=409, detail="The order has no active stock reservation"
+        )
 
-    await shop_db.shipping.update(
-        where={"id": order.shipping_id},
-        data={"status": ShippingStatus.CANCELLED},
-    )
+    return Response(status_code=204)
+
+
+@router.post("/cancel", summary="Cancel a batch of orders")
+async def handle_cancel_orders(
+    data: OrdersCancel,
+    shop_db: ShopsClient = Depends(get_shops_db),
+):
+    cancelled = await cancel_orders(shop_db, data.order_ids)
+
+    return {
+        "results": [
+            {"id": order_id, "status": "cancelled" if found else "not_found"}
+            for order_id, found in cancelled.items()
+        ]
+    }
+
+
+@router.patch("/{order_id}/cancel")
+async def handle_cancel_order(
+    order_id: int,
+    shop_db: ShopsClient = Depends(get_shops_db),
+):
+    cancelled = await cancel_orders(shop_db, [order_id])
+
+    if not cancelled[order_id]:
+        return Response(status_code=404)
 
     return Response(status_code=204)
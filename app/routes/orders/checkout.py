@@ -0,0 +1,446 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.constants import PaymentStatus, ShippingStatus
+from app.core.security import token_cache_ttl
+from app.database import connected_tenants, use_db
+from app.models.orders import OrderCreate
+from app.routes.analytics.rollups import (
+    apply_rollup_changes,
+    lock_order_states,
+    with_statuses,
+)
+from app.routes.customers.utils import get_customer_by_email
+from app.routes.products.utils import product_tag, products_response_cache
+from prisma import Prisma as ShopsClient
+from prisma.models import customers as Customers
+from prisma.models import orders as Orders
+
+# Conditional decrement: never takes the stock below zero, so concurrent
+# checkouts of the last units cannot oversell.
+RESERVE_STOCK_SQL = """
+    UPDATE products SET stock = stock - $1::int
+    WHERE id = $2 AND stock >= $1::int AND NOT hidden
+    RETURNING id
+"""
+
+RESTOCK_SQL = "UPDATE products SET stock = stock + $1::int WHERE id = $2"
+
+LOCK_CUSTOMER_SQL = "SELECT id FROM customers WHERE id = $1::uuid FOR UPDATE"
+
+# Prisma stores `Timestamp` columns as UTC wall time.
+CLAIM_EXPIRED_RESERVATIONS_SQL = """
+    DELETE FROM stock_reservations WHERE id IN (
+        SELECT id FROM stock_reservations
+        WHERE expires_at <= now() AT TIME ZONE 'utc'
+        ORDER BY id
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING order_id, product_id, quantity
+"""
+
+CLAIM_ORDER_RESERVATIONS_SQL = """
+    DELETE FROM stock_reservations
+    WHERE order_id = ANY(string_to_array($1, ',')::bigint[])
+    RETURNING order_id, product_id, quantity
+"""
+
+
+def sum_quantities(items: list) -> dict[int, int]:
+    """Add up the quantities per product of order items or reservation rows."""
+    quantities: dict[int, int] = {}
+    for item in items:
+        product_id = item["product_id"] if isinstance(item, dict) else item.product_id
+        quantity = item["quantity"] if isinstance(item, dict) else item.quantity
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+async def reserve_stock(tx: ShopsClient, quantities: dict[int, int]) -> None:
+    """Take the ordered quantities from the stock.
+
+    Products are locked in id order, so concurrent checkouts of overlapping
+    carts cannot deadlock.
+
+    Args:
+        tx (ShopsClient): Transaction client.
+        quantities (dict[int, int]): Quantity per product id.
+
+    Raises:
+        HTTPException: If a product is hidden or has not enough stock. The
+            transaction is rolled back.
+    """
+    for product_id in sorted(quantities):
+        reserved = await tx.query_first(
+            RESERVE_STOCK_SQL, quantities[product_id], product_id
+        )
+
+        if reserved is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Product {product_id} is out of stock",
+            )
+
+
+async def restock(tx: ShopsClient, reservations: list[dict]) -> list[int]:
+    """Return reserved quantities to the stock, locking products in id order.
+
+    Args:
+        tx (ShopsClient): Transaction client.
+        reservations (list[dict]): Claimed `product_id`/`quantity` rows.
+
+    Returns:
+        list[int]: Restocked product ids.
+    """
+    quantities = sum_quantities(reservations)
+
+    for product_id in sorted(quantities):
+        await tx.execute_raw(RESTOCK_SQL, quantities[product_id], product_id)
+
+    return sorted(quantities)
+
+
+async def release_order_reservations(
+    tx: ShopsClient, order_ids: list[int]
+) -> list[int]:
+    """Drop the reservations of some orders and return their stock.
+
+    Args:
+        tx (ShopsClient): Transaction client.
+        order_ids (list[int]): Orders whose reservations are released.
+
+    Returns:
+        list[int]: Restocked product ids.
+    """
+    if not order_ids:
+        return []
+
+    reservations = await tx.query_raw(
+        CLAIM_ORDER_RESERVATIONS_SQL, ",".join(str(id_) for id_ in order_ids)
+    )
+    return await restock(tx, reservations)
+
+
+async def invalidate_stock(product_ids: list[int]) -> None:
+    """Drop the cached detail of products whose stock changed.
+
+    Listings are left to expire, so a busy checkout does not keep emptying
+    the listing cache.
+    """
+    if product_ids:
+        await products_response_cache.invalidate(*map(product_tag, product_ids))
+
+
+async def get_checkout_customer(
+    shop_db: ShopsClient, data: OrderCreate, token_data: Union[dict, bool], admin: bool
+) -> Customers:
+    """Get the customer a checkout is for.
+
+    With a secret key, it is the `customer_id` of the request. Otherwise it is
+    the signed-in customer, who cannot order for anyone else.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        data (OrderCreate): Checkout request.
+        token_data (Union[dict, bool]): Access token claims, or False without
+            a valid token.
+        admin (bool): Whether the request has a valid secret key.
+
+    Raises:
+        HTTPException: If the request is not authorized or the customer
+            does not exist.
+
+    Returns:
+        Customers: The customer.
+    """
+    if admin:
+        if data.customer_id is None:
+            raise HTTPException(status_code=400, detail="customer_id is required")
+
+        customer = await shop_db.customers.find_unique(
+            where={"id": str(data.customer_id)}
+        )
+    elif token_data:
+        customer = None
+        if token_data.get("email"):
+            customer = await get_customer_by_email(
+                shop_db,
+                token_data["email"],
+                ttl=token_cache_ttl(token_data, settings.CUSTOMER_CACHE_TTL),
+            )
+
+        if customer and data.customer_id not in (None, UUID(customer.id)):
+            raise HTTPException(status_code=403, detail="Unauthorized access")
+    else:
+        raise HTTPException(status_code=403, detail="Unauthorized access")
+
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    return customer
+
+
+async def check_pending_orders(tx: ShopsClient, customer_id: str) -> None:
+    """Refuse a checkout when the customer already has
+    `CHECKOUT_MAX_PENDING_ORDERS` orders holding stock, so nobody can take the
+    whole inventory by checking out over and over.
+
+    The customer row stays locked until the transaction ends, so concurrent
+    checkouts of the same customer are counted one after the other.
+
+    Args:
+        tx (ShopsClient): Transaction client.
+        customer_id (str): Customer placing the order.
+
+    Raises:
+        HTTPException: If the customer has too many pending orders.
+    """
+    await tx.query_raw(LOCK_CUSTOMER_SQL, customer_id)
+
+    pending = await tx.orders.count(
+        where={"customer_id": customer_id, "stock_reservations": {"some": {}}}
+    )
+    if pending >= settings.CHECKOUT_MAX_PENDING_ORDERS:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many pending orders. Confirm or cancel one first",
+        )
+
+
+async def create_order(
+    shop_db: ShopsClient, data: OrderCreate, customer_id: str, address_id: int
+) -> Orders:
+    """Create an order with its items, payment and shipping in one transaction,
+    reserving the stock of its products until `STOCK_RESERVATION_TTL` expires.
+
+    The stock is decremented last, so the product rows stay locked for as
+    short as possible when many buyers hit the same product.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        data (OrderCreate): Checkout request.
+        customer_id (str): Customer placing the order.
+        address_id (int): Shipping address.
+
+    Raises:
+        HTTPException: If a product does not exist or is out of stock, or
+            the customer has too many pending orders.
+
+    Returns:
+        Orders: The pending order, with its items, payment and shipping.
+    """
+    quantities = sum_quantities(data.items)
+
+    products = await shop_db.products.find_many(
+        where={"id": {"in": list(quantities)}, "hidden": False}
+    )
+    prices = {product.id: product.price for product in products}
+
+    for product_id in quantities:
+        if product_id not in prices:
+            raise HTTPException(
+                status_code=404, detail=f"Product {product_id} not found"
+            )
+
+    amount = sum(prices[id_] * quantity for id_, quantity in quantities.items())
+    expires_at = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.STOCK_RESERVATION_TTL
+    )
+
+    async with shop_db.tx() as tx:
+        await check_pending_orders(tx, customer_id)
+        payment = await tx.payments.create(
+            data={
+                "amount": amount,
+                "method": data.payment_method,
+                "status": PaymentStatus.PENDING,
+            }
+        )
+        shipping = await tx.shipping.create(
+            data={
+                "address_id": address_id,
+                "status": ShippingStatus.PENDING,
+                "estimated_delivery": settings.SHIPPING_ESTIMATED_DELIVERY_DAYS,
+            }
+        )
+        order = await tx.orders.create(
+            data={
+                "customer_id": customer_id,
+                "shipping_id": shipping.id,
+                "payment_id": payment.id,
+                "order_items": {
+                    "create": [
+                        {"product_id": product_id, "quantity": quantities[product_id]}
+                        for product_id in sorted(quantities)
+                    ]
+                },
+            },
+            include={"order_items": True, "payments": True, "shipping": True},
+        )
+        await tx.stock_reservations.create_many(
+            data=[
+                {
+                    "order_id": order.id,
+                    "product_id": product_id,
+                    "quantity": quantity,
+                    "expires_at": expires_at,
+                }
+                for product_id, quantity in quantities.items()
+            ]
+        )
+        await reserve_stock(tx, quantities)
+        await apply_rollup_changes(
+            tx,
+            [],
+            [
+                {
+                    "day": order.ordered_at.date().isoformat(),
+                    "payment_status": PaymentStatus.PENDING,
+                    "shipping_status": ShippingStatus.PENDING,
+                    "amount": amount,
+                    "items": quantities,
+                }
+            ],
+        )
+
+    await invalidate_stock(list(quantities))
+
+    return order
+
+
+async def confirm_order(shop_db: ShopsClient, order: Orders) -> bool:
+    """Mark the payment of a pending order as paid, consuming its reservations.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        order (Orders): The order.
+
+    Returns:
+        bool: False if the order has no reservation left (it expired, was
+            cancelled or was already confirmed).
+    """
+    async with shop_db.tx() as tx:
+        # Deleting the reservations claims them: a concurrent sweep or
+        # cancellation blocks on the rows and then finds nothing to release.
+        claimed = await tx.execute_raw(
+            "DELETE FROM stock_reservations WHERE order_id = $1", order.id
+        )
+
+        if not claimed:
+            return False
+
+        states = await lock_order_states(tx, [order.id])
+        await tx.payments.update(
+            where={"id": order.payment_id},
+            data={
+                "status": PaymentStatus.SUCCESS,
+                "paid_at": datetime.now(timezone.utc),
+            },
+        )
+        await apply_rollup_changes(
+            tx, states, [with_statuses(s, PaymentStatus.SUCCESS) for s in states]
+        )
+
+    return True
+
+
+async def release_expired_reservations(shop_db: ShopsClient, limit: int = 500) -> int:
+    """Cancel the orders whose reservations expired and return their stock.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        limit (int, optional): Maximum reservations released. Defaults to 500.
+
+    Returns:
+        int: Number of released reservations.
+    """
+    async with shop_db.tx() as tx:
+        reservations = await tx.query_raw(CLAIM_EXPIRED_RESERVATIONS_SQL, limit)
+
+        if not reservations:
+            return 0
+
+        product_ids = await restock(tx, reservations)
+        states = await lock_order_states(
+            tx, sorted({r["order_id"] for r in reservations})
+        )
+        # An order split across sweeps is already cancelled the second time.
+        expired = [s for s in states if s["payment_status"] == PaymentStatus.PENDING]
+
+        if expired:
+            await tx.payments.update_many(
+                where={"id": {"in": [s["payment_id"] for s in expired]}},
+                data={"status": PaymentStatus.CANCELLED},
+            )
+            await tx.shipping.update_many(
+                where={"id": {"in": [s["shipping_id"] for s in expired]}},
+                data={"status": ShippingStatus.CANCELLED},
+            )
+            await apply_rollup_changes(
+                tx,
+                expired,
+                [
+                    with_statuses(s, PaymentStatus.CANCELLED, ShippingStatus.CANCELLED)
+                    for s in expired
+                ],
+            )
+
+    await invalidate_stock(product_ids)
+
+    return len(reservations)
+
+
+class ReservationSweeper:
+    """Background task releasing expired stock reservations every `interval`
+    seconds, in the database of every connected shop."""
+
+    def __init__(self, interval: int = 30):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        """Release every expired reservation.
+
+        Shops without a connected client are swept once they get a request.
+
+        Returns:
+            int: Number of released reservations.
+        """
+        total = 0
+        for tenant in connected_tenants():
+            try:
+                async with use_db(tenant) as shop_db:
+                    while released := await release_expired_reservations(shop_db):
+                        total += released
+            except Exception as e:
+                print(f"Failed to release expired reservations: {e}")
+        return total
+
+    async def _sweep_periodically(self):
+        while True:
+            await self.sweep()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background sweep on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_periodically())
+
+    async def stop(self):
+        """Cancel the background sweep."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+reservation_sweeper = ReservationSweeper(settings.RESERVATION_SWEEP_INTERVAL)
@@ -0,0 +1,142 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from app.core.pagination import keyset_after_desc
+from app.database import use_read_db
+from app.models.orders import order_adapter
+from prisma.models import orders as Orders
+
+ORDER_EXPORT_INCLUDE = {
+    "payments": True,
+    "shipping": {"include": {"addresses": True}},
+    "order_items": True,
+}
+
+CSV_COLUMNS = [
+    "order_id",
+    "ordered_at",
+    "customer_id",
+    "payment_id",
+    "payment_status",
+    "payment_method",
+    "amount",
+    "paid_at",
+    "shipping_id",
+    "shipping_status",
+    "estimated_delivery",
+    "shipped_at",
+    "delivered_at",
+    "address_label",
+    "city",
+    "state",
+    "zip_code",
+    "country",
+    "items",
+]
+
+
+async def iter_order_batches(
+    tenant: Optional[str],
+    from_date: Optional[datetime],
+    to_date: Optional[datetime],
+    batch_size: int,
+    primary: bool = False,
+) -> AsyncIterator[list[Orders]]:
+    """Read orders newest first in keyset-paginated batches, with a read
+    client of the shop borrowed until the last batch.
+
+    Args:
+        tenant (Optional[str]): Shop of the orders (None in single tenant
+            mode).
+        from_date (Optional[datetime]): Only orders placed at or after it.
+        to_date (Optional[datetime]): Only orders placed before it.
+        batch_size (int): Orders per query.
+        primary (bool, optional): Read from the primary instead of the
+            replica. Defaults to False.
+
+    Yields:
+        list[orders]: Orders with payments, shipping (and address) and items.
+    """
+    date_range = {}
+    if from_date:
+        date_range["gte"] = from_date
+    if to_date:
+        date_range["lt"] = to_date
+
+    filters = [{"ordered_at": date_range}] if date_range else []
+    last = None
+
+    async with use_read_db(tenant, primary) as shop_db:
+        while True:
+            where = filters + (
+                [keyset_after_desc("ordered_at", *last)] if last else []
+            )
+            batch = await shop_db.orders.find_many(
+                where={"AND": where} if where else None,
+                take=batch_size,
+                order=[{"ordered_at": "desc"}, {"id": "desc"}],
+                include=ORDER_EXPORT_INCLUDE,
+            )
+
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+
+            last = (batch[-1].ordered_at, batch[-1].id)
+
+
+async def iter_orders_ndjson(batches: AsyncIterator[list[Orders]]) -> AsyncIterator[bytes]:
+    """Serialize order batches as NDJSON, one order per line."""
+    async for batch in batches:
+        yield b"".join(order_adapter.dump_json(order) + b"\n" for order in batch)
+
+
+def order_csv_row(order: Orders) -> list:
+    payment = order.payments
+    shipping = order.shipping
+    address = shipping.addresses if shipping else None
+
+    return [
+        order.id,
+        order.ordered_at.isoformat() if order.ordered_at else "",
+        order.customer_id,
+        order.payment_id,
+        payment.status if payment else "",
+        payment.method if payment else "",
+        payment.amount if payment else "",
+        payment.paid_at.isoformat() if payment and payment.paid_at else "",
+        order.shipping_id,
+        shipping.status if shipping else "",
+        shipping.estimated_delivery if shipping else "",
+        shipping.shipped_at.isoformat() if shipping and shipping.shipped_at else "",
+        shipping.delivered_at.isoformat() if shipping and shipping.delivered_at else "",
+        address.address_label if address else "",
+        address.city if address else "",
+        address.state if address else "",
+        address.zip_code if address else "",
+        address.country if address else "",
+        ";".join(f"{item.product_id}:{item.quantity}" for item in order.order_items or []),
+    ]
+
+
+async def iter_orders_csv(batches: AsyncIterator[list[Orders]]) -> AsyncIterator[bytes]:
+    """Serialize order batches as CSV, one order per row.
+
+    Items are listed in a single column as `product_id:quantity` pairs
+    separated by `;`.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    async for batch in batches:
+        writer.writerows(order_csv_row(order) for order in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,128 @@
+from typing import Optional
+
+from fastapi import HTTPException
+
+ORDER_FIELDS = ("id", "customer_id", "shipping_id", "payment_id", "ordered_at")
+
+# Relations that can be expanded (nested ones with dots) and the fields of
+# each that can be returned. Customer passwords are never exposed.
+ORDER_RELATIONS: dict[str, tuple[str, ...]] = {
+    "payments": ("id", "amount", "method", "status", "paid_at"),
+    "shipping": (
+        "id",
+        "address_id",
+        "status",
+        "estimated_delivery",
+        "delivered_at",
+        "shipped_at",
+    ),
+    "shipping.addresses": (
+        "id",
+        "address_label",
+        "city",
+        "state",
+        "zip_code",
+        "country",
+    ),
+    "customers": (
+        "id",
+        "first_name",
+        "last_name",
+        "email",
+        "phone",
+        "default_address_id",
+        "created_at",
+    ),
+    "order_items": ("id", "order_id", "product_id", "quantity"),
+}
+
+# To-many relations, serialized as lists.
+ORDER_LIST_RELATIONS = frozenset({"order_items"})
+
+
+def split_param(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def order_projection(
+    fields: Optional[str], expand: Optional[str], default_expand: tuple[str, ...]
+) -> tuple[Optional[dict], dict]:
+    """Build the Prisma `include` and the serialized fields of an order query
+    from the `fields` and `expand` query parameters.
+
+    Relations are only queried when expanded, either through `expand` or by
+    asking for one of their fields (e.g. `fields=id,payments.status`). An
+    expanded relation without any requested field returns all of them. The
+    order id is always returned.
+
+    Args:
+        fields (Optional[str]): Comma separated fields. Defaults to every
+            order field.
+        expand (Optional[str]): Comma separated relations. An empty value
+            expands nothing. Defaults to the relations named in `fields`,
+            or to `default_expand` when `fields` is not given either.
+        default_expand (tuple[str, ...]): Relations expanded when neither
+            `fields` nor `expand` is given.
+
+    Raises:
+        HTTPException: If a field or relation is not allowed.
+
+    Returns:
+        tuple[Optional[dict], dict]: Prisma `include` (None without
+            relations), and the `include` passed to the serializer.
+    """
+    if expand is not None:
+        expanded = set(split_param(expand))
+    else:
+        expanded = set(default_expand if fields is None else ())
+    selected: dict[str, set[str]] = {}
+
+    for relation in expanded:
+        if relation not in ORDER_RELATIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot expand {relation}. "
+                f"Expandable relations: {', '.join(ORDER_RELATIONS)}",
+            )
+
+    for field in split_param(fields) if fields is not None else ORDER_FIELDS:
+        relation, _, name = field.rpartition(".")
+        allowed = ORDER_RELATIONS.get(relation, ()) if relation else ORDER_FIELDS
+
+        if name not in allowed:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {field}")
+
+        selected.setdefault(relation, set()).add(name)
+        if relation:
+            expanded.add(relation)
+
+    # Expanding a nested relation expands its parents.
+    for relation in list(expanded):
+        parts = relation.split(".")
+        expanded.update(".".join(parts[:i]) for i in range(1, len(parts)))
+
+    def build(prefix: str) -> tuple[dict, dict]:
+        include, serialized = {}, {}
+
+        for relation in sorted(expanded):
+            parent, _, name = relation.rpartition(".")
+            if parent != prefix:
+                continue
+
+            nested_include, nested_serialized = build(relation)
+            include[name] = {"include": nested_include} if nested_include else True
+
+            columns = selected.get(relation) or ORDER_RELATIONS[relation]
+            projection = {**{column: True for column in columns}, **nested_serialized}
+            serialized[name] = (
+                {"__all__": projection} if name in ORDER_LIST_RELATIONS else projection
+            )
+
+        return include, serialized
+
+    include, serialized = build("")
+    return include or None, {
+        "id": True,
+        **{field: True for field in selected.get("", ())},
+        **serialized,
+    }
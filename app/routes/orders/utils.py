@@ -0,0 +1,51 @@
+from app.constants import PaymentStatus, ShippingStatus
+from app.routes.analytics.rollups import (
+    apply_rollup_changes,
+    lock_order_states,
+    with_statuses,
+)
+from app.routes.orders.checkout import invalidate_stock, release_order_reservations
+from prisma import Prisma as ShopsClient
+
+
+async def cancel_orders(shop_db: ShopsClient, order_ids: list[int]) -> dict[int, bool]:
+    """Cancel the payment and shipping of a set of orders in one transaction,
+    returning the stock still reserved for them.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        order_ids (list[int]): Orders to cancel.
+
+    Returns:
+        dict[int, bool]: Whether each order was found (and cancelled).
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+
+    async with shop_db.tx() as tx:
+        # Reservations first, then payments: the same lock order as the
+        # confirmation and the reservation sweeper.
+        restocked = await release_order_reservations(tx, order_ids)
+        states = await lock_order_states(tx, order_ids)
+
+        if states:
+            await tx.payments.update_many(
+                where={"id": {"in": [s["payment_id"] for s in states]}},
+                data={"status": PaymentStatus.CANCELLED},
+            )
+            await tx.shipping.update_many(
+                where={"id": {"in": [s["shipping_id"] for s in states]}},
+                data={"status": ShippingStatus.CANCELLED},
+            )
+            await apply_rollup_changes(
+                tx,
+                states,
+                [
+                    with_statuses(s, PaymentStatus.CANCELLED, ShippingStatus.CANCELLED)
+                    for s in states
+                ],
+            )
+
+    await invalidate_stock(restocked)
+
+    found = {s["id"] for s in states}
+    return {order_id: order_id in found for order_id in order_ids}
@@ -1,15 +1,55 @@
+import asyncio
+from typing import Literal
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, Request, Response, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
 
 from app.config import settings
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import json_response
+from app.database import get_current_tenant
 from app.database import get_db as get_shops_db
-from app.models.products import ProductCreate, ProductUpdateVisibility
+from app.database import get_read_db as get_shops_read_db
+from app.models.products import (
+    ProductBulkUpdate,
+    ProductCreate,
+    ProductUpdateVisibility,
+    product_adapter,
+    product_bulk_update_adapter,
+    product_list_adapter,
+)
+from app.routes.products.bulk import (
+    bulk_update_products,
+    import_products,
+    iter_csv_rows,
+    iter_ndjson_rows,
+)
+from app.routes.products.queries import find_products_page
+from app.routes.products.search import (
+    count_search_results,
+    refresh_search_vectors,
+    search_products,
+)
 from app.routes.products.utils import (
-    parse_products_response_data,
+    CATALOG_TAG,
+    LISTING_TAG,
+    count_products,
+    invalidate_products_cache,
+    parse_product_listing_rows,
     parse_single_product_response_data,
+    product_tag,
+    products_response_cache,
 )
-from app.services.storage import upload_file
+from app.services.images import is_processable_image, process_mediafile_variants
+from app.services.storage import StorageBackend, get_storage
 from prisma import Prisma as ShopsClient
 
 router = APIRouter(tags=["products"])
@@ -17,32 +57,127 @@ router = APIRouter(tags=["products"])
 
 @router.get("/", summary="Get all products")
 async def handle_get_products(
-    shop_db: ShopsClient = Depends(get_shops_db),
+    request: Request,
+    shop_db: ShopsClient = Depends(get_shops_read_db),
     limit: int = 20,
     offset: int = 0,
     search: str = None,
+    search_mode: Literal["contains", "fulltext"] = "contains",
+    cursor: str = None,
+    count: Literal["exact", "estimate", "none"] = "exact",
 ):
-    data = await shop_db.products.find_many(
-        where={"name": {"contains": search}} if search else None,
-        include={
-            "product_categories": {"include": {"categories": True}},
-            "products_mediafiles": {"include": {"mediafiles": True}, "take": 1},
+    return await products_response_cache.fetch(
+        request,
+        shop_db,
+        [LISTING_TAG],
+        lambda client: get_products_page(
+            client, limit, offset, search, search_mode, cursor, count
+        ),
+    )
+
+
+async def get_products_page(
+    shop_db: ShopsClient,
+    limit: int,
+    offset: int,
+    search: str,
+    search_mode: str,
+    cursor: str,
+    count: str,
+):
+    """Build a product listing page, by id or by search relevance."""
+    if search and search_mode == "fulltext":
+        if cursor:
+            raise HTTPException(
+                status_code=400,
+                detail="cursor cannot be combined with fulltext search; use offset",
+            )
+        return await get_search_results_page(shop_db, search, limit, offset, count)
+
+    after_id = None
+    if cursor:
+        [after_id] = decode_cursor(cursor, 1)
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    data, total = await asyncio.gather(
+        find_products_page(
+            shop_db,
+            limit,
+            offset=0 if cursor or offset < 0 else offset,
+            after_id=after_id,
+            search=search,
+        ),
+        count_products(
+            shop_db, {"name": {"contains": search}} if search else None, count
+        ),
+    )
+
+    next_cursor = encode_cursor(data[-1]["id"]) if data and len(data) == limit else None
+
+    return json_response(
+        product_list_adapter,
+        {
+            "products": parse_product_listing_rows(data),
+            "total": total,
+            "next_cursor": next_cursor,
         },
-        take=limit,
-        skip=offset if offset > 0 else 0,
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
     )
-    count = await shop_db.products.count()
 
-    return {
-        "products": parse_products_response_data(data),
-        "total": count,
-    }
+
+async def get_search_results_page(
+    shop_db: ShopsClient, search: str, limit: int, offset: int, count: str
+):
+    """Build a product listing page ranked by search relevance, with the
+    matched fragments of each product highlighted."""
+    offset = offset if offset > 0 else 0
+    if count == "none":
+        ranked, total = await search_products(shop_db, search, limit, offset), None
+    else:
+        ranked, total = await asyncio.gather(
+            search_products(shop_db, search, limit, offset),
+            count_search_results(shop_db, search),
+        )
+
+    data = await find_products_page(
+        shop_db, len(ranked), product_ids=[r["id"] for r in ranked]
+    )
+    products_by_id = {p["id"]: p for p in parse_product_listing_rows(data)}
+
+    return json_response(
+        product_list_adapter,
+        {
+            "products": [
+                {
+                    **products_by_id[r["id"]],
+                    "rank": r["rank"],
+                    "highlight": {"name": r["name"], "description": r["description"]},
+                }
+                for r in ranked
+                if r["id"] in products_by_id
+            ],
+            "total": total,
+            "next_cursor": None,
+        },
+    )
 
 
 @router.get("/{product_id}", summary="Get a single product")
 async def handle_get_product(
-    product_id: int, shop_db: ShopsClient = Depends(get_shops_db)
+    request: Request,
+    product_id: int,
+    shop_db: ShopsClient = Depends(get_shops_read_db),
 ):
+    return await products_response_cache.fetch(
+        request,
+        shop_db,
+        [product_tag(product_id), CATALOG_TAG],
+        lambda client: get_product_response(client, product_id),
+    )
+
+
+async def get_product_response(shop_db: ShopsClient, product_id: int):
     product = await shop_db.products.find_unique(
         where={"id": product_id},
         include={
@@ -54,7 +189,7 @@ async def handle_get_product(
     if not product:
         return Response(status_code=404)
 
-    return parse_single_product_response_data(product)
+    return json_response(product_adapter, parse_single_product_response_data(product))
 
 
 @router.post("/", summary="Create a new product")
@@ -76,7 +211,66 @@ async def handle_create_product(
             "products_mediafiles": {"include": {"mediafiles": True}},
         },
     )
-    return parse_single_product_response_data(new_product)
+    await refresh_search_vectors(shop_db, [new_product.id])
+    await invalidate_products_cache(new_product.id)
+
+    return json_response(
+        product_adapter, parse_single_product_response_data(new_product)
+    )
+
+
+@router.post("/import", summary="Bulk import products from CSV or NDJSON")
+async def handle_import_products(
+    request: Request,
+    format: Literal["csv", "ndjson"] = None,
+    shop_db: ShopsClient = Depends(get_shops_db),
+):
+    if format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        if content_type == "text/csv":
+            format = "csv"
+        elif content_type in ("application/x-ndjson", "application/jsonl"):
+            format = "ndjson"
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail="Send text/csv or application/x-ndjson, or set the format parameter",
+            )
+
+    parse_rows = iter_csv_rows if format == "csv" else iter_ndjson_rows
+    report = await import_products(
+        shop_db, parse_rows(request.stream()), settings.PRODUCTS_IMPORT_BATCH_SIZE
+    )
+
+    if report["imported"]:
+        await invalidate_products_cache()
+
+    return report
+
+
+@router.patch("/bulk", summary="Bulk update product prices, stock and visibility")
+async def handle_bulk_update_products(
+    data: ProductBulkUpdate,
+    return_products: bool = False,
+    shop_db: ShopsClient = Depends(get_shops_db),
+):
+    updated, missing = await bulk_update_products(
+        shop_db, data.products, settings.PRODUCTS_BULK_UPDATE_BATCH_SIZE
+    )
+
+    if updated:
+        await invalidate_products_cache(*updated)
+
+    result = {"updated": len(updated), "missing": len(missing), "missing_ids": missing}
+    if return_products:
+        rows = (
+            await find_products_page(shop_db, len(updated), product_ids=updated)
+            if updated
+            else []
+        )
+        result["products"] = parse_product_listing_rows(rows)
+
+    return json_response(product_bulk_update_adapter, result)
 
 
 @router.put("/{product_id}", summary="Update a product")
@@ -117,7 +311,12 @@ async def handle_update_product(
     if updated_product is None:
         return Response(status_code=404)
 
-    return parse_single_product_response_data(updated_product)
+    await refresh_search_vectors(shop_db, [product_id])
+    await invalidate_products_cache(product_id)
+
+    return json_response(
+        product_adapter, parse_single_product_response_data(updated_product)
+    )
 
 
 @router.delete("/{product_id}", summary="Delete a product")
@@ -129,6 +328,8 @@ async def handle_delete_product(
     if deleted_product is None:
         return Response(status_code=404)
 
+    await invalidate_products_cache(product_id)
+
     return Response(status_code=204)
 
 
@@ -137,17 +338,21 @@ async def handle_create_product_mediafile(
     product_id: int,
     request: Request,
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     shop_db: ShopsClient = Depends(get_shops_db),
+    storage: StorageBackend = Depends(get_storage),
 ):
     extension = file.filename.split(".")[-1]
 
     id_ = str(uuid4())
 
-    upload_file(file.file, "products/" + id_ + "." + extension)
+    url = await storage.upload(
+        file, "products/" + id_ + "." + extension, content_type=file.content_type
+    )
 
     new_mediafile = await shop_db.mediafiles.create(
         data={
-            "url": f"{settings.AZURE_STORAGE}/{settings.AZURE_PUBLIC_CONTAINER}/products/{id_}.{extension}",
+            "url": url,
             "type": file.content_type,
         }
     )
@@ -155,6 +360,24 @@ async def handle_create_product_mediafile(
     await shop_db.products_mediafiles.create(
         data={"product_id": product_id, "media_file_id": new_mediafile.id}
     )
+    await invalidate_products_cache(product_id)
+
+    if is_processable_image(file.content_type):
+        # The upload is closed once the response is sent, so read it now.
+        await file.seek(0)
+        # The request's database client is released before background tasks
+        # run, so the task borrows the shop's own.
+        background_tasks.add_task(
+            process_mediafile_variants,
+            get_current_tenant(),
+            storage,
+            new_mediafile.id,
+            "products/" + id_,
+            await file.read(),
+        )
+        # Background tasks run in order: drop the responses that still point
+        # to the original once the thumbnail is rendered.
+        background_tasks.add_task(invalidate_products_cache, product_id)
 
     return new_mediafile
 
@@ -173,4 +396,8 @@ async def handle_change_product_visibility(
     if not updated_product:
         return Response(status_code=404)
 
-    return parse_single_product_response_data(updated_product)
+    await invalidate_products_cache(product_id)
+
+    return json_response(
+        product_adapter, parse_single_product_response_data(updated_product)
+    )
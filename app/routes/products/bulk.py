@@ -0,0 +1,410 @@
+import codecs
+import csv
+import logging
+from datetime import timedelta
+from typing import AsyncIterator, Optional, Union
+
+import orjson
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.models.products import ProductBulkUpdateRow, ProductCreate
+from app.routes.products.search import refresh_search_vectors
+from prisma import Prisma as ShopsClient
+from prisma.errors import PrismaError
+
+logger = logging.getLogger(__name__)
+
+ImportRow = tuple[int, Union[dict, str]]
+"""Line number and either the parsed row or a parse error message."""
+
+CSV_CATEGORY_SEPARATOR = "|"
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed UTF-8 body into lines without buffering it whole.
+
+    Args:
+        stream (AsyncIterator[bytes]): Request body stream.
+
+    Raises:
+        HTTPException: If the body is not valid UTF-8.
+
+    Yields:
+        str: Each line, without the line terminator.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+
+    try:
+        async for chunk in stream:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 encoded")
+
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """Parse a streamed NDJSON body, one product object per line.
+
+    Args:
+        stream (AsyncIterator[bytes]): Request body stream.
+
+    Yields:
+        ImportRow: Line number and parsed object (or error message).
+    """
+    line_number = 0
+    async for line in iter_lines(stream):
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield line_number, "Invalid JSON"
+            continue
+
+        yield line_number, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+async def iter_csv_records(
+    stream: AsyncIterator[bytes], max_record_size: int
+) -> AsyncIterator[tuple[int, Optional[str]]]:
+    """Group the lines of a streamed CSV body into records, so quoted fields
+    can span several lines.
+
+    A record ends at the first line break outside quotes, i.e. once it holds
+    an even number of `"` (escaped quotes are doubled).
+
+    Args:
+        stream (AsyncIterator[bytes]): Request body stream.
+        max_record_size (int): Characters after which an unterminated quoted
+            field is reported instead of buffering the rest of the body.
+
+    Yields:
+        tuple[int, Optional[str]]: Line number where the record starts, and
+            the record (or None if it was too long).
+    """
+    record, start, quotes, size = [], 0, 0, 0
+    line_number = 0
+    async for line in iter_lines(stream):
+        line_number += 1
+        if not record:
+            start = line_number
+        record.append(line)
+        quotes += line.count('"')
+        size += len(line) + 1
+
+        if quotes % 2 == 0:
+            yield start, "\n".join(record)
+            record, quotes, size = [], 0, 0
+        elif size > max_record_size:
+            yield start, None
+            record, quotes, size = [], 0, 0
+
+    if record:
+        yield start, "\n".join(record)
+
+
+async def iter_csv_rows(
+    stream: AsyncIterator[bytes], max_record_size: int = 1024 * 1024
+) -> AsyncIterator[ImportRow]:
+    """Parse a streamed CSV body with a header row.
+
+    Categories are separated by `|` in the `categories` column. Quoted fields
+    may span several lines.
+
+    Args:
+        stream (AsyncIterator[bytes]): Request body stream.
+        max_record_size (int, optional): Longest record, in characters.
+            Defaults to 1 MiB.
+
+    Yields:
+        ImportRow: Line number and parsed row (or error message).
+    """
+    header = None
+    async for line_number, record in iter_csv_records(stream, max_record_size):
+        if record is None:
+            yield line_number, "Unterminated quoted field"
+            continue
+        if not record.strip():
+            continue
+
+        try:
+            [values] = csv.reader([record])
+        except (csv.Error, ValueError):
+            yield line_number, "Invalid CSV line"
+            continue
+
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+
+        if len(values) != len(header):
+            yield line_number, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+
+        row = dict(zip(header, values))
+        categories = row.get("categories")
+        row["categories"] = [
+            c.strip() for c in (categories or "").split(CSV_CATEGORY_SEPARATOR) if c.strip()
+        ]
+        if not row.get("hidden"):
+            row.pop("hidden", None)
+
+        yield line_number, row
+
+
+async def insert_products_batch(
+    shop_db: ShopsClient, products: list[ProductCreate]
+) -> list[int]:
+    """Insert a batch of products and their categories in one transaction.
+
+    Ids are reserved from the sequence first so both tables can be written
+    with `create_many`.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        products (list[ProductCreate]): Validated products.
+
+    Returns:
+        list[int]: Ids of the new products.
+    """
+    async with shop_db.tx(timeout=timedelta(seconds=60)) as tx:
+        rows = await tx.query_raw(
+            "SELECT nextval(pg_get_serial_sequence('products', 'id')) AS id "
+            "FROM generate_series(1, $1)",
+            len(products),
+        )
+        ids = [row["id"] for row in rows]
+
+        await tx.products.create_many(
+            data=[
+                {
+                    "id": id_,
+                    "name": p.name,
+                    "description": p.description,
+                    "stock": p.stock,
+                    "price": int(p.price),
+                    "hidden": p.hidden,
+                }
+                for id_, p in zip(ids, products)
+            ]
+        )
+        await tx.product_categories.create_many(
+            data=[
+                {"product_id": id_, "category_id": c}
+                for id_, p in zip(ids, products)
+                for c in set(p.categories)
+            ]
+        )
+        await refresh_search_vectors(tx, ids)
+
+    return ids
+
+
+async def import_products(
+    shop_db: ShopsClient,
+    rows: AsyncIterator[ImportRow],
+    batch_size: int,
+    max_errors: int = 1000,
+) -> dict:
+    """Validate streamed product rows and insert them in batches.
+
+    Only the current batch is held in memory. Batches are committed on their
+    own; when one cannot be inserted, its rows are reported as failed and the
+    import goes on. At most `max_errors` row errors are reported in detail;
+    `failed` counts all of them.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        rows (AsyncIterator[ImportRow]): Parsed rows.
+        batch_size (int): Rows per insert transaction.
+        max_errors (int, optional): Detailed errors to report. Defaults to 1000.
+
+    Returns:
+        dict: `imported` and `failed` counts and the per-row `errors`.
+    """
+    known_categories = {c.slug for c in await shop_db.categories.find_many()}
+    report = {"imported": 0, "failed": 0, "errors": []}
+    batch: list[tuple[int, ProductCreate]] = []
+
+    def add_error(line_number: int, errors: list[dict]):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": line_number, "errors": errors})
+
+    async def insert_batch():
+        try:
+            await insert_products_batch(shop_db, [product for _, product in batch])
+            report["imported"] += len(batch)
+        except PrismaError:
+            first, last = batch[0][0], batch[-1][0]
+            logger.exception("Could not insert the products of rows %d-%d", first, last)
+            message = f"Could not insert the batch of rows {first}-{last}"
+            for line_number, _ in batch:
+                add_error(line_number, [{"field": None, "message": message}])
+
+    async for line_number, row in rows:
+        if isinstance(row, str):
+            add_error(line_number, [{"field": None, "message": row}])
+            continue
+
+        try:
+            product = ProductCreate.model_validate(row)
+        except ValidationError as e:
+            add_error(
+                line_number,
+                [
+                    {
+                        "field": ".".join(str(loc) for loc in error["loc"]),
+                        "message": error["msg"],
+                    }
+                    for error in e.errors(include_url=False)
+                ],
+            )
+            continue
+
+        unknown_categories = set(product.categories) - known_categories
+        if unknown_categories:
+            add_error(
+                line_number,
+                [
+                    {"field": "categories", "message": f"Unknown category: {c}"}
+                    for c in sorted(unknown_categories)
+                ],
+            )
+            continue
+
+        batch.append((line_number, product))
+        if len(batch) >= batch_size:
+            await insert_batch()
+            batch = []
+
+    if batch:
+        await insert_batch()
+
+    return report
+
+
+# Locks the rows in id order before the set-based update, like checkout
+# does, so concurrent writers cannot deadlock.
+LOCK_PRODUCTS_SQL = """
+    SELECT id FROM products
+    WHERE id = ANY(string_to_array($1, ',')::bigint[])
+    ORDER BY id
+    FOR UPDATE
+"""
+
+# Types of the `id`, `price`, `stock` and `hidden` values, which are null
+# when a field is left unchanged.
+BULK_UPDATE_TYPES = ("bigint", "bigint", "int", "boolean")
+
+# The new stock is the units on hand; `products.stock` excludes the units
+# still reserved by pending orders, which are returned when they expire.
+# It is clamped at zero when fewer units are on hand than are reserved.
+# The rows are locked, so no reservation of them can be taken meanwhile.
+BULK_UPDATE_SQL = """
+    UPDATE products p SET
+        price = coalesce(v.price, p.price),
+        stock = coalesce(
+            greatest(
+                v.stock - (
+                    SELECT coalesce(sum(r.quantity), 0)
+                    FROM stock_reservations r
+                    WHERE r.product_id = p.id
+                ),
+                0
+            ),
+            p.stock
+        ),
+        hidden = coalesce(v.hidden, p.hidden)
+    FROM (VALUES {values}) AS v(id, price, stock, hidden)
+    WHERE p.id = v.id
+"""
+
+
+async def update_products_batch(
+    shop_db: ShopsClient, rows: list[ProductBulkUpdateRow]
+) -> list[int]:
+    """Apply a batch of price, stock and visibility changes in one transaction.
+
+    Omitted fields keep their current value. The stock is the number of units
+    on hand, so the units reserved by pending orders are subtracted from it,
+    down to zero.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        rows (list[ProductBulkUpdateRow]): Changes, at most one per product.
+
+    Returns:
+        list[int]: Ids of the updated products (the others do not exist).
+    """
+    async with shop_db.tx(timeout=timedelta(seconds=60)) as tx:
+        locked = await tx.query_raw(
+            LOCK_PRODUCTS_SQL, ",".join(str(row.id) for row in rows)
+        )
+        ids = [row["id"] for row in locked]
+
+        if ids:
+            existing = set(ids)
+            values, params = [], []
+            for row in rows:
+                if row.id not in existing:
+                    continue
+                n = len(params)
+                placeholders = (
+                    f"${n + i}::{type_}" for i, type_ in enumerate(BULK_UPDATE_TYPES, 1)
+                )
+                values.append(f"({', '.join(placeholders)})")
+                params += [row.id, row.price, row.stock, row.hidden]
+
+            await tx.execute_raw(
+                BULK_UPDATE_SQL.format(values=", ".join(values)), *params
+            )
+
+    return ids
+
+
+async def bulk_update_products(
+    shop_db: ShopsClient, rows: list[ProductBulkUpdateRow], batch_size: int
+) -> tuple[list[int], list[int]]:
+    """Apply price, stock and visibility changes in batches of `batch_size`
+    rows, each committed on its own.
+
+    Rows of the same product are merged, later values winning.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        rows (list[ProductBulkUpdateRow]): Changes.
+        batch_size (int): Rows per transaction.
+
+    Returns:
+        tuple[list[int], list[int]]: Updated and missing product ids.
+    """
+    merged: dict[int, ProductBulkUpdateRow] = {}
+    for row in rows:
+        previous = merged.get(row.id)
+        merged[row.id] = (
+            row
+            if previous is None
+            else previous.model_copy(update=row.model_dump(exclude_none=True))
+        )
+
+    latest = [merged[id_] for id_ in sorted(merged)]
+    updated: list[int] = []
+
+    for start in range(0, len(latest), batch_size):
+        batch = latest[start : start + batch_size]
+        updated += await update_products_batch(shop_db, batch)
+
+    found = set(updated)
+    return updated, [row.id for row in latest if row.id not in found]
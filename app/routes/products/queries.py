@@ -0,0 +1,92 @@
+from typing import Optional
+
+from prisma import Prisma as ShopsClient
+
+# The page of products is selected first so the lateral joins only run for
+# the rows that are returned. Column aliases match the listing response keys.
+PRODUCT_LISTING_SQL = """
+SELECT
+    p.id,
+    p.name,
+    p.price,
+    p.description,
+    p.hidden AS "isHidden",
+    coalesce(c.categories, '[]'::json) AS categories,
+    m.thumbnail AS "thumbnailImg",
+    p.stock,
+    p.created_at AS "createdAt"
+FROM (
+    SELECT p.id, p.name, p.price, p.description, p.hidden, p.stock, p.created_at
+    FROM products p
+    WHERE {where}
+    ORDER BY p.id
+    LIMIT {limit} OFFSET {offset}
+) p
+LEFT JOIN LATERAL (
+    SELECT json_agg(
+        json_build_object('id', cat.slug, 'name', cat.name, 'description', cat.description)
+    ) AS categories
+    FROM product_categories pc
+    JOIN categories cat ON cat.slug = pc.category_id
+    WHERE pc.product_id = p.id
+) c ON TRUE
+LEFT JOIN LATERAL (
+    SELECT coalesce(mf.variants->'thumbnail'->>'webp', mf.url) AS thumbnail
+    FROM products_mediafiles pm
+    JOIN mediafiles mf ON mf.id = pm.media_file_id
+    WHERE pm.product_id = p.id
+    ORDER BY pm.id
+    LIMIT 1
+) m ON TRUE
+ORDER BY p.id
+"""
+
+
+async def find_products_page(
+    shop_db: ShopsClient,
+    limit: int,
+    offset: int = 0,
+    after_id: Optional[int] = None,
+    search: Optional[str] = None,
+    product_ids: Optional[list[int]] = None,
+) -> list[dict]:
+    """Fetch a page of the product listing in a single round trip.
+
+    Categories are aggregated with `json_agg` and the thumbnail is the
+    thumbnail variant (or the original) of the first media file, both
+    through `LATERAL` joins, and only the columns used by
+    the listing response are read.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        limit (int): Page size.
+        offset (int, optional): Rows to skip. Defaults to 0.
+        after_id (Optional[int]): Only return products after this id (cursor).
+        search (Optional[str]): Only return products whose name contains it.
+        product_ids (Optional[list[int]]): Only return these products.
+
+    Returns:
+        list[dict]: Listing rows, ordered by id.
+    """
+    conditions = []
+    params = []
+
+    def param(value) -> str:
+        params.append(value)
+        return f"${len(params)}"
+
+    if search:
+        conditions.append(f"strpos(p.name, {param(search)}) > 0")
+    if after_id is not None:
+        conditions.append(f"p.id > {param(after_id)}")
+    if product_ids is not None:
+        ids = ",".join(str(id_) for id_ in product_ids)
+        conditions.append(f"p.id = ANY(string_to_array({param(ids)}, ',')::bigint[])")
+
+    query = PRODUCT_LISTING_SQL.format(
+        where=" AND ".join(conditions) or "TRUE",
+        limit=param(limit),
+        offset=param(offset),
+    )
+
+    return await shop_db.query_raw(query, *params)
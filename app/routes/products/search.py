@@ -0,0 +1,136 @@
+import json
+from typing import Optional
+
+from app.config import settings
+from app.database.tenancy import tenant_key
+from app.routes.products.utils import products_count_cache
+from prisma import Prisma as ShopsClient
+
+# Name is weighted above description; both use the configured text search
+# configuration so queries and documents are normalized the same way.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector($1::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector($1::regconfig, coalesce(description, '')), 'B')"
+)
+
+SEARCH_MATCH_SQL = "(p.search_vector @@ q.query OR p.name % $2)"
+
+HIGHLIGHT_OPTIONS = "StartSel=<mark>, StopSel=</mark>"
+
+
+def escape_html_sql(column: str) -> str:
+    """Escape the HTML special characters of a text column in SQL.
+
+    `ts_headline` only adds the `<mark>` tags, so stored text has to be escaped
+    before it is highlighted or it would be rendered as markup by clients.
+
+    Args:
+        column (str): SQL expression of the text to escape.
+
+    Returns:
+        str: SQL expression of the escaped text.
+    """
+    return (
+        f"replace(replace(replace({column}, '&', '&amp;'), "
+        "'<', '&lt;'), '>', '&gt;')"
+    )
+
+
+async def refresh_search_vectors(
+    shop_db: ShopsClient, product_ids: Optional[list[int]] = None
+) -> int:
+    """Recompute the full-text search vector of products.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        product_ids (Optional[list[int]]): Products to refresh. Defaults to all.
+
+    Returns:
+        int: Number of updated rows.
+    """
+    if product_ids is None:
+        return await shop_db.execute_raw(
+            f"UPDATE products SET search_vector = {SEARCH_VECTOR_SQL}",
+            settings.SEARCH_TEXT_CONFIG,
+        )
+
+    if not product_ids:
+        return 0
+
+    return await shop_db.execute_raw(
+        f"UPDATE products SET search_vector = {SEARCH_VECTOR_SQL} "
+        "WHERE id = ANY(string_to_array($2, ',')::bigint[])",
+        settings.SEARCH_TEXT_CONFIG,
+        ",".join(str(id_) for id_ in product_ids),
+    )
+
+
+async def search_products(
+    shop_db: ShopsClient, search: str, limit: int, offset: int
+) -> list[dict]:
+    """Rank products against a search query.
+
+    Matches either the weighted `search_vector` (GIN index) or a trigram
+    similarity on the name (`pg_trgm` index) so misspelled terms still match.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        search (str): Search query, in web search syntax.
+        limit (int): Page size.
+        offset (int): Number of ranked results to skip.
+
+    Returns:
+        list[dict]: `id`, `rank` and HTML-escaped, highlighted
+            `name`/`description` fragments, best match first.
+    """
+    return await shop_db.query_raw(
+        f"""
+        SELECT r.id, r.rank,
+            ts_headline($1::regconfig, {escape_html_sql('p.name')}, q.query, 'HighlightAll=true, {HIGHLIGHT_OPTIONS}') AS name,
+            ts_headline($1::regconfig, {escape_html_sql('p.description')}, q.query, 'MaxFragments=2, {HIGHLIGHT_OPTIONS}') AS description
+        FROM (
+            SELECT p.id,
+                coalesce(ts_rank_cd(p.search_vector, q.query), 0) + similarity(p.name, $2) AS rank
+            FROM products p, websearch_to_tsquery($1::regconfig, $2) AS q(query)
+            WHERE {SEARCH_MATCH_SQL}
+            ORDER BY rank DESC, p.id
+            LIMIT $3 OFFSET $4
+        ) r
+        JOIN products p ON p.id = r.id
+        CROSS JOIN websearch_to_tsquery($1::regconfig, $2) AS q(query)
+        ORDER BY r.rank DESC, r.id
+        """,
+        settings.SEARCH_TEXT_CONFIG,
+        search,
+        limit,
+        offset,
+    )
+
+
+async def count_search_results(shop_db: ShopsClient, search: str) -> int:
+    """Count the products matching a search query, cached like listing counts.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        search (str): Search query, in web search syntax.
+
+    Returns:
+        int: Number of matching products.
+    """
+    key = tenant_key(json.dumps({"fulltext": search}))
+    count = products_count_cache.get(key)
+
+    if count is None:
+        row = await shop_db.query_first(
+            f"""
+            SELECT count(*)::int AS count
+            FROM products p, websearch_to_tsquery($1::regconfig, $2) AS q(query)
+            WHERE {SEARCH_MATCH_SQL}
+            """,
+            settings.SEARCH_TEXT_CONFIG,
+            search,
+        )
+        count = row["count"]
+        products_count_cache.set(key, count)
+
+    return count
@@ -1,5 +1,105 @@
+import json
+from typing import Literal, Optional
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.core.cache.responses import ResponseCache
+from app.database.tenancy import tenant_key
+from prisma import Prisma as ShopsClient
+from prisma.models import mediafiles as Mediafiles
 from prisma.models import products as Products
 
+products_count_cache = TTLCache(maxsize=256, ttl=settings.PRODUCTS_COUNT_CACHE_TTL)
+products_response_cache = ResponseCache(
+    "products",
+    ttl=settings.RESPONSE_CACHE_TTL,
+    stale_ttl=settings.RESPONSE_CACHE_STALE_TTL,
+)
+
+# Response cache tags: every listing page depends on LISTING_TAG, the detail
+# of a product on `product_tag(id)` and CATALOG_TAG.
+LISTING_TAG = "listing"
+CATALOG_TAG = "catalog"
+
+# Writes touching more products than this drop every cached detail at once
+# instead of bumping one tag per product.
+MAX_INVALIDATED_PRODUCT_TAGS = 100
+
+
+def product_tag(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+async def invalidate_products_cache(*product_ids: int) -> None:
+    """Drop cached product listing data, and the cached detail of the given
+    products. Called by every product write.
+
+    Args:
+        *product_ids (int): Products whose detail changed.
+    """
+    products_count_cache.clear()
+
+    if len(product_ids) > MAX_INVALIDATED_PRODUCT_TAGS:
+        await products_response_cache.invalidate(LISTING_TAG, CATALOG_TAG)
+    else:
+        await products_response_cache.invalidate(
+            LISTING_TAG, *(product_tag(product_id) for product_id in product_ids)
+        )
+
+
+async def count_products(
+    shop_db: ShopsClient,
+    where: Optional[dict],
+    mode: Literal["exact", "estimate", "none"] = "exact",
+) -> Optional[int]:
+    """Count the products matching a listing filter.
+
+    Exact counts are cached per filter for `PRODUCTS_COUNT_CACHE_TTL` seconds.
+    Estimates come from the planner statistics and are only used on
+    unfiltered listings.
+
+    Args:
+        shop_db (ShopsClient): Database client.
+        where (Optional[dict]): Prisma `where` clause of the listing.
+        mode (str, optional): `exact`, `estimate` or `none`. Defaults to "exact".
+
+    Returns:
+        Optional[int]: The count, or None when skipped.
+    """
+    if mode == "none":
+        return None
+
+    if mode == "estimate" and where is None:
+        row = await shop_db.query_first(
+            "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = 'products'::regclass"
+        )
+        # reltuples is -1 until the table has been analyzed.
+        if row and row["estimate"] >= 0:
+            return row["estimate"]
+
+    key = tenant_key(json.dumps(where, sort_keys=True))
+    count = products_count_cache.get(key)
+
+    if count is None:
+        count = await shop_db.products.count(where=where)
+        products_count_cache.set(key, count)
+
+    return count
+
+
+def get_thumbnail_url(mediafile: Mediafiles) -> str:
+    """Get the URL of the thumbnail variant of a media file, falling back to
+    the original while variants are not rendered (or for non-images).
+
+    Args:
+        mediafile (mediafiles): The media file.
+
+    Returns:
+        str: The thumbnail URL.
+    """
+    variants = mediafile.variants or {}
+    return variants.get("thumbnail", {}).get("webp") or mediafile.url
+
 
 def parse_products_response_data(data: list[Products]) -> list[dict]:
     """Parse products response data to remove unwanted fields,
@@ -28,7 +128,7 @@ def parse_products_response_data(data: list[Products]) -> list[dict]:
                 for c in p.product_categories
             ],
             "thumbnailImg": (
-                p.products_mediafiles[0].mediafiles.url
+                get_thumbnail_url(p.products_mediafiles[0].mediafiles)
                 if len(p.products_mediafiles) > 0
                 else None
             ),
@@ -39,6 +139,25 @@ def parse_products_response_data(data: list[Products]) -> list[dict]:
     ]
 
 
+def parse_product_listing_rows(rows: list[dict]) -> list[dict]:
+    """Parse rows returned by `find_products_page` into the listing JSON schema.
+
+    The query already selects the response fields, so only the aggregated
+    categories may need decoding.
+
+    Args:
+        rows (list[dict]): Rows from `find_products_page`.
+
+    Returns:
+        list[dict]: The parsed data.
+    """
+    for row in rows:
+        if isinstance(row["categories"], str):
+            row["categories"] = json.loads(row["categories"])
+
+    return rows
+
+
 def parse_single_product_response_data(data: Products) -> dict:
     """Parse single product response data to remove unwanted fields,
     and return the proper JSON schema.
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.database import use_db
+from app.services.storage import StorageBackend
+from prisma import Json
+
+logger = logging.getLogger(__name__)
+
+# Largest first: each variant is downscaled from the previous one.
+VARIANT_WIDTHS = {"full": 1600, "card": 640, "thumbnail": 320}
+
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+# Formats Pillow cannot decode are stored as uploaded, without variants.
+UNSUPPORTED_CONTENT_TYPES = {"image/svg+xml"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def render_variants(data: bytes) -> dict[str, dict]:
+    """Decode an image once and encode its fixed-width variants.
+
+    Runs in a worker process. Images narrower than a variant width are not
+    upscaled.
+
+    Args:
+        data (bytes): Original image.
+
+    Returns:
+        dict[str, dict]: Per variant, its `width`, `height` and the encoded
+            bytes of each format.
+    """
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    variants = {}
+    for name, width in VARIANT_WIDTHS.items():
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        encoded = {}
+        for fmt, (pil_format, _, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, format=pil_format, **options)
+            encoded[fmt] = buffer.getvalue()
+
+        variants[name] = {"width": image.width, "height": image.height, **encoded}
+
+    return variants
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the process pool used to render image variants, creating it on first use."""
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the image process pool, if it was created."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def is_processable_image(content_type: Optional[str]) -> bool:
+    """Whether variants can be rendered for a file of this content type."""
+    return bool(
+        content_type
+        and content_type.startswith("image/")
+        and content_type not in UNSUPPORTED_CONTENT_TYPES
+    )
+
+
+async def process_mediafile_variants(
+    tenant: Optional[str],
+    storage: StorageBackend,
+    mediafile_id: int,
+    base_name: str,
+    data: bytes,
+) -> None:
+    """Render, store and record the variants of an uploaded image.
+
+    Variants are stored next to the original as `{base_name}_{variant}.{format}`
+    and recorded in the `variants` column of the media file.
+
+    Args:
+        tenant (Optional[str]): Shop of the media file (None in single tenant
+            mode).
+        storage (StorageBackend): Storage backend of the original.
+        mediafile_id (int): Media file of the original.
+        base_name (str): Storage name of the original, without extension.
+        data (bytes): Original image.
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+        rendered = await loop.run_in_executor(get_executor(), render_variants, data)
+    except Exception:
+        logger.exception("Could not render variants of mediafile %s", mediafile_id)
+        return
+
+    uploads = {}
+    for name, variant in rendered.items():
+        for fmt, (_, content_type, _) in VARIANT_FORMATS.items():
+            uploads[(name, fmt)] = storage.upload(
+                variant[fmt], f"{base_name}_{name}.{fmt}", content_type=content_type
+            )
+
+    urls = dict(zip(uploads.keys(), await asyncio.gather(*uploads.values())))
+
+    variants = {
+        name: {
+            "width": variant["width"],
+            "height": variant["height"],
+            **{fmt: urls[(name, fmt)] for fmt in VARIANT_FORMATS},
+        }
+        for name, variant in rendered.items()
+    }
+
+    async with use_db(tenant) as shop_db:
+        await shop_db.mediafiles.update(
+            where={"id": mediafile_id}, data={"variants": Json(variants)}
+        )
@@ -0,0 +1,163 @@
+import asyncio
+from typing import Optional
+from urllib.parse import quote
+
+import httpx
+
+from app.config import settings
+
+# Failures that guarantee the request was never sent.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Responses of a proxy in front of Keycloak, which may still have processed
+# the request (e.g. a 504 once Keycloak is slow to answer).
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# Grants whose code or token Keycloak only accepts once: replaying one that
+# was already consumed fails, and revokes the tokens issued for it. They are
+# only retried when the request was never sent.
+SINGLE_USE_GRANTS = {"authorization_code", "refresh_token"}
+
+
+class KeycloakError(Exception):
+    """Raised when Keycloak rejects a request or cannot be reached."""
+
+
+class KeycloakClient:
+    """Asyncio client for the Keycloak OpenID Connect endpoints of a realm.
+
+    Requests share one connection-pooled `httpx.AsyncClient` with keep-alive,
+    and are retried with exponential backoff when the connection fails, or
+    when a proxy answers 502-504 to a request that can be safely replayed.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        realm: str,
+        client_id: str,
+        client_secret: str,
+        timeout: float = 10,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=f"{server_url}/realms/{quote(realm)}/protocol/openid-connect",
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3)),
+            limits=httpx.Limits(
+                max_connections=100, max_keepalive_connections=20, keepalive_expiry=60
+            ),
+            transport=transport,
+        )
+
+    async def _post(
+        self, path: str, data: dict, retry_responses: bool = True
+    ) -> httpx.Response:
+        data = {"client_id": self.client_id, "client_secret": self.client_secret, **data}
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+
+            try:
+                response = await self._client.post(path, data=data)
+            except RETRYABLE_ERRORS as e:
+                error = f"Keycloak unreachable: {e}"
+                continue
+            except httpx.HTTPError as e:
+                raise KeycloakError(f"Keycloak request failed: {e}") from e
+
+            retryable = response.status_code in RETRYABLE_STATUS_CODES
+            if not (retryable and retry_responses):
+                return response
+            error = f"Keycloak unavailable: HTTP {response.status_code}"
+
+        raise KeycloakError(error)
+
+    @staticmethod
+    def _error(response: httpx.Response) -> KeycloakError:
+        try:
+            body = response.json()
+            message = body.get("error_description") or body.get("error")
+        except ValueError:
+            message = None
+        return KeycloakError(f"{response.status_code}: {message or response.text}")
+
+    async def token(self, grant_type: str, **params: str) -> dict:
+        """Request tokens from the token endpoint.
+
+        Args:
+            grant_type (str): OAuth2 grant type, e.g. `authorization_code`.
+            **params (str): Grant parameters, e.g. `code` and `redirect_uri`.
+
+        Raises:
+            KeycloakError: If Keycloak rejects the grant or is unreachable.
+
+        Returns:
+            dict: Token response (`access_token`, `refresh_token`, `expires_in`...).
+        """
+        response = await self._post(
+            "/token",
+            {"grant_type": grant_type, **params},
+            retry_responses=grant_type not in SINGLE_USE_GRANTS,
+        )
+
+        if response.status_code != 200:
+            raise self._error(response)
+
+        return response.json()
+
+    async def logout(self, refresh_token: str) -> None:
+        """End the session of a refresh token.
+
+        Args:
+            refresh_token (str): Refresh token of the session.
+
+        Raises:
+            KeycloakError: If Keycloak rejects the token or is unreachable.
+        """
+        response = await self._post("/logout", {"refresh_token": refresh_token})
+
+        if response.status_code >= 400:
+            raise self._error(response)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_keycloak: Optional[KeycloakClient] = None
+
+
+def get_keycloak() -> KeycloakClient:
+    """Get the shared Keycloak client, creating it on first use.
+
+    Returns:
+        KeycloakClient: Client for the configured realm.
+    """
+    global _keycloak
+
+    if _keycloak is None:
+        _keycloak = KeycloakClient(
+            settings.KEYCLOAK_URL,
+            settings.KEYCLOAK_REALM,
+            settings.KEYCLOAK_CLIENT_ID,
+            settings.KEYCLOAK_CLIENT_SECRET,
+            timeout=settings.KEYCLOAK_TIMEOUT,
+            max_retries=settings.KEYCLOAK_MAX_RETRIES,
+        )
+
+    return _keycloak
+
+
+async def close_keycloak() -> None:
+    """Close the shared Keycloak client, if it was created."""
+    global _keycloak
+
+    if _keycloak is not None:
+        await _keycloak.close()
+        _keycloak = None
@@ -0,0 +1,155 @@
+"""Local stand-in for the Keycloak OpenID Connect endpoints of a realm.
+
+Serves `token`, `logout` and `certs` with tokens signed by a generated RSA
+key, for tests and benchmarks. Mount it in-process through
+`httpx.ASGITransport`, or run it as a server:
+
+    uvicorn app.services.keycloak.stub:app --port 8081
+"""
+
+import json
+import secrets
+import time
+from typing import Optional
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Form, HTTPException, Response
+from jwt.algorithms import RSAAlgorithm
+
+DEFAULT_USER = {
+    "preferred_username": "jdoe",
+    "email": "jdoe@example.com",
+    "given_name": "John",
+    "family_name": "Doe",
+}
+
+
+class StubOIDCProvider:
+    """Issues and tracks tokens for the stand-in realm."""
+
+    def __init__(
+        self,
+        client_id: str = "tiendify",
+        client_secret: str = "secret",
+        user: Optional[dict] = None,
+        access_token_lifespan: int = 300,
+        refresh_token_lifespan: int = 1800,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.user = user or DEFAULT_USER
+        self.access_token_lifespan = access_token_lifespan
+        self.refresh_token_lifespan = refresh_token_lifespan
+        self.kid = secrets.token_hex(8)
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._sessions: set[str] = set()
+
+    @property
+    def jwks(self) -> dict:
+        """Public signing keys, as served by the `certs` endpoint."""
+        jwk = json.loads(RSAAlgorithm.to_jwk(self._key.public_key()))
+        return {"keys": [{**jwk, "kid": self.kid, "use": "sig", "alg": "RS256"}]}
+
+    def issue_tokens(self, user: Optional[dict] = None) -> dict:
+        """Create a session and return a token response for it."""
+        now = int(time.time())
+        session = secrets.token_urlsafe(16)
+        self._sessions.add(session)
+
+        access_token = jwt.encode(
+            {
+                **(user or self.user),
+                "sub": secrets.token_hex(8),
+                "sid": session,
+                "aud": ["account"],
+                "iat": now,
+                "exp": now + self.access_token_lifespan,
+            },
+            self._key,
+            algorithm="RS256",
+            headers={"kid": self.kid},
+        )
+
+        return {
+            "access_token": access_token,
+            "expires_in": self.access_token_lifespan,
+            "refresh_token": session,
+            "refresh_expires_in": self.refresh_token_lifespan,
+            "token_type": "Bearer",
+        }
+
+    def end_session(self, refresh_token: str) -> bool:
+        if refresh_token not in self._sessions:
+            return False
+        self._sessions.discard(refresh_token)
+        return True
+
+
+def invalid_grant() -> Response:
+    return Response(
+        status_code=400,
+        content=json.dumps({"error": "invalid_grant", "error_description": "Invalid grant"}),
+        media_type="application/json",
+    )
+
+
+def create_stub_app(
+    provider: Optional[StubOIDCProvider] = None, realm: str = "tiendify"
+) -> FastAPI:
+    """Create the ASGI app serving the stand-in realm.
+
+    Args:
+        provider (Optional[StubOIDCProvider]): Token issuer. Defaults to a new one.
+        realm (str, optional): Realm name in the URLs. Defaults to "tiendify".
+
+    Returns:
+        FastAPI: The stand-in application (`app.state.provider` holds the issuer).
+    """
+    provider = provider or StubOIDCProvider()
+    stub = FastAPI(title="Keycloak stand-in")
+    stub.state.provider = provider
+    base = f"/realms/{realm}/protocol/openid-connect"
+
+    def check_client(client_id: str, client_secret: str):
+        if client_id != provider.client_id or client_secret != provider.client_secret:
+            raise HTTPException(status_code=401, detail="invalid_client")
+
+    @stub.post(base + "/token")
+    async def token(
+        grant_type: str = Form(),
+        client_id: str = Form(),
+        client_secret: str = Form(),
+        code: str = Form(None),
+        refresh_token: str = Form(None),
+    ):
+        check_client(client_id, client_secret)
+
+        if grant_type == "authorization_code" and code and code != "invalid":
+            return provider.issue_tokens()
+        if grant_type == "refresh_token" and provider.end_session(refresh_token or ""):
+            return provider.issue_tokens()
+
+        return invalid_grant()
+
+    @stub.post(base + "/logout")
+    async def logout(
+        client_id: str = Form(),
+        client_secret: str = Form(),
+        refresh_token: str = Form(),
+    ):
+        check_client(client_id, client_secret)
+
+        if not provider.end_session(refresh_token):
+            return invalid_grant()
+
+        return Response(status_code=204)
+
+    @stub.get(base + "/certs")
+    async def certs():
+        return provider.jwks
+
+    return stub
+
+
+app = create_stub_app()
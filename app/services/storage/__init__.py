@@ -1,38 +1,251 @@
-from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from base64 import b64encode
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Protocol, Union
 
 from app.config import settings
 
-credential = DefaultAzureCredential()
-blob_service_client = BlobServiceClient(
-    account_url=settings.AZURE_STORAGE, credential=credential
-)
+if TYPE_CHECKING:
+    from azure.storage.blob.aio import BlobClient
 
 
-def upload_file(file: bytes, file_name: str, overwrite=True) -> dict:
-    """Upload a file to Azure Blob Storage.
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
 
-    Args:
-        file (bytes): File to upload.
-        file_name (str): Name of the file.
-        overwrite (bool, optional): Overwrite if file already exists. Defaults to True.
 
-    Returns:
-        dict: Upload response from Azure.
+class BytesReader:
+    """Expose in-memory bytes through the `AsyncReadable` interface."""
+
+    def __init__(self, data: bytes):
+        self._data = memoryview(data)
+        self._position = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        end = len(self._data) if size < 0 else self._position + size
+        chunk = self._data[self._position : end].tobytes()
+        self._position += len(chunk)
+        return chunk
+
+
+class StorageBackend(ABC):
+    """Interface of the public file storage used for product media."""
+
+    @abstractmethod
+    async def upload(
+        self,
+        data: Union[bytes, AsyncReadable],
+        file_name: str,
+        content_type: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> str:
+        """Upload a file, reading it in chunks.
+
+        Args:
+            data (Union[bytes, AsyncReadable]): File content or an async reader
+                (e.g. `UploadFile`).
+            file_name (str): Name of the file.
+            content_type (Optional[str]): MIME type of the file.
+            overwrite (bool, optional): Overwrite if file already exists. Defaults to True.
+
+        Returns:
+            str: Public URL of the file.
+        """
+
+    @abstractmethod
+    async def delete(self, file_name: str) -> None:
+        """Delete a file.
+
+        Args:
+            file_name (str): Name of the file.
+        """
+
+    @abstractmethod
+    def get_url(self, file_name: str) -> str:
+        """Get the public URL of a file.
+
+        Args:
+            file_name (str): Name of the file.
+
+        Returns:
+            str: Public URL.
+        """
+
+    async def close(self) -> None:
+        """Release the resources held by the backend."""
+
+
+class AzureBlobStorage(StorageBackend):
+    """Azure Blob Storage backend built on the asyncio client.
+
+    Files larger than one chunk are uploaded as blocks staged in parallel,
+    with at most `max_concurrency` chunks held in memory at once.
     """
-    blob_client = blob_service_client.get_blob_client(
-        container=settings.AZURE_PUBLIC_CONTAINER, blob=file_name
-    )
-    return blob_client.upload_blob(file, overwrite=overwrite)
 
+    def __init__(
+        self,
+        account_url: str,
+        container: str,
+        chunk_size: int = 4 * 1024 * 1024,
+        max_concurrency: int = 4,
+    ):
+        self.account_url = account_url.rstrip("/")
+        self.container = container
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        # The Azure SDK takes a while to import, so only load it when the
+        # backend is first used.
+        from azure.identity.aio import DefaultAzureCredential
+        from azure.storage.blob.aio import BlobServiceClient
+
+        self._credential = DefaultAzureCredential()
+        self._service_client = BlobServiceClient(
+            account_url=account_url, credential=self._credential
+        )
+        self._container_client = self._service_client.get_container_client(container)
+
+    async def upload(
+        self,
+        data: Union[bytes, AsyncReadable],
+        file_name: str,
+        content_type: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> str:
+        from azure.storage.blob import BlobBlock, ContentSettings
+
+        reader = BytesReader(data) if isinstance(data, bytes) else data
+        blob_client = self._container_client.get_blob_client(file_name)
+        content_settings = ContentSettings(content_type=content_type)
+
+        chunk = await reader.read(self.chunk_size)
+        if len(chunk) < self.chunk_size:
+            await blob_client.upload_blob(
+                chunk, overwrite=overwrite, content_settings=content_settings
+            )
+            return self.get_url(file_name)
+
+        block_ids = []
+        tasks = []
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        try:
+            while chunk:
+                block_id = b64encode(f"{len(block_ids):08d}".encode()).decode()
+                block_ids.append(block_id)
+
+                await slots.acquire()
+                tasks.append(
+                    asyncio.create_task(
+                        self._stage_block(blob_client, block_id, chunk, slots)
+                    )
+                )
+                chunk = await reader.read(self.chunk_size)
 
-def delete_file(file_name: str) -> None:
-    """Delete a file from Azure Blob Storage.
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
 
-    Args:
-        file_name (str): Name of the file.
+        await blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids],
+            content_settings=content_settings,
+        )
+        return self.get_url(file_name)
+
+    @staticmethod
+    async def _stage_block(
+        blob_client: "BlobClient", block_id: str, chunk: bytes, slots: asyncio.Semaphore
+    ):
+        try:
+            await blob_client.stage_block(block_id, chunk, length=len(chunk))
+        finally:
+            slots.release()
+
+    async def delete(self, file_name: str) -> None:
+        await self._container_client.delete_blob(file_name)
+
+    def get_url(self, file_name: str) -> str:
+        return f"{self.account_url}/{self.container}/{file_name}"
+
+    async def close(self) -> None:
+        await self._service_client.close()
+        await self._credential.close()
+
+
+class LocalStorage(StorageBackend):
+    """Local filesystem backend for development and tests."""
+
+    def __init__(self, root: str, base_url: str, chunk_size: int = 1024 * 1024):
+        self.root = Path(root).resolve()
+        self.base_url = base_url.rstrip("/")
+        self.chunk_size = chunk_size
+
+    def _path(self, file_name: str) -> Path:
+        path = (self.root / file_name).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Invalid file name: {file_name}")
+        return path
+
+    async def upload(
+        self,
+        data: Union[bytes, AsyncReadable],
+        file_name: str,
+        content_type: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> str:
+        reader = BytesReader(data) if isinstance(data, bytes) else data
+        path = self._path(file_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        f = await asyncio.to_thread(open, path, "wb" if overwrite else "xb")
+        try:
+            while chunk := await reader.read(self.chunk_size):
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+
+        return self.get_url(file_name)
+
+    async def delete(self, file_name: str) -> None:
+        await asyncio.to_thread(os.remove, self._path(file_name))
+
+    def get_url(self, file_name: str) -> str:
+        return f"{self.base_url}/{file_name}"
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Get the configured storage backend, creating it on first use.
+
+    Returns:
+        StorageBackend: The storage backend selected by `STORAGE_BACKEND`.
     """
-    blob_client = blob_service_client.get_blob_client(
-        container=settings.AZURE_PUBLIC_CONTAINER, blob=file_name
-    )
-    blob_client.delete_blob()
+    global _storage
+
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "local":
+            _storage = LocalStorage(
+                settings.STORAGE_LOCAL_ROOT, settings.STORAGE_LOCAL_URL
+            )
+        else:
+            _storage = AzureBlobStorage(
+                settings.AZURE_STORAGE,
+                settings.AZURE_PUBLIC_CONTAINER,
+                chunk_size=settings.STORAGE_CHUNK_SIZE,
+                max_concurrency=settings.STORAGE_MAX_CONCURRENCY,
+            )
+
+    return _storage
+
+
+async def close_storage() -> None:
+    """Close the storage backend, if it was created."""
+    global _storage
+
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,285 @@
+"""In-process load test of the API.
+
+Drives the FastAPI `app` from `main.py` through `httpx.ASGITransport` (no
+network, no server) against the Postgres database in `BENCHMARK_DATABASE_URL`,
+which is truncated and seeded with synthetic data for every size. Keycloak is
+replaced by the local stand-in (its JWKS is loaded into the signing key cache)
+and Azure by the local filesystem storage, so no external service is needed.
+
+For every size and scenario it reports throughput and p50/p95/p99 latency, and
+optionally writes the results as JSON so runs can be compared.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.api \\
+        [--sizes small medium] [--requests 500] [--concurrency 10] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from benchmarks.environment import configure_environment, git_commit
+
+configure_environment()
+
+import httpx  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.core.cache.responses import close_cache_backend  # noqa: E402
+from app.core.security import jwks_cache, verified_secret_keys  # noqa: E402
+from app.core.security.utils import generate_secret_key  # noqa: E402
+from app.database import db  # noqa: E402
+from app.routes.categories.utils import categories_cache  # noqa: E402
+from app.routes.products.utils import invalidate_products_cache  # noqa: E402
+from app.services.keycloak.stub import StubOIDCProvider  # noqa: E402
+from benchmarks.seed import SIZES, seed  # noqa: E402
+from main import app, lifespan  # noqa: E402
+
+
+@dataclass
+class Credentials:
+    cookies: str
+    admin_key: str
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Builds the request arguments (method, url, headers) for one call.
+    build: Callable[[random.Random, dict, Credentials], tuple[str, str, dict]]
+
+
+SCENARIOS = (
+    Scenario("products_list", lambda r, ids, c: ("GET", "/products/?limit=20", {})),
+    Scenario(
+        "products_list_offset",
+        lambda r, ids, c: (
+            "GET",
+            f"/products/?limit=20&offset={r.randrange(max(ids['products'] - 20, 1))}",
+            {},
+        ),
+    ),
+    Scenario(
+        "products_search",
+        lambda r, ids, c: (
+            "GET",
+            "/products/?limit=20&search_mode=fulltext"
+            f"&search={r.choice(('shirt', 'mug', 'lamp'))}",
+            {},
+        ),
+    ),
+    Scenario(
+        "product_detail",
+        lambda r, ids, c: ("GET", f"/products/{r.randint(1, ids['products'])}", {}),
+    ),
+    Scenario("orders_list", lambda r, ids, c: ("GET", "/orders/?limit=20", {})),
+    Scenario(
+        "categories", lambda r, ids, c: ("GET", "/categories/categories", {})
+    ),
+    Scenario(
+        "auth_me",
+        lambda r, ids, c: ("GET", "/auth/private/me", {"Cookie": c.cookies}),
+    ),
+    Scenario(
+        "analytics_daily_sales",
+        lambda r, ids, c: (
+            "GET",
+            "/analytics/sales/daily",
+            {"Authorization": f"Bearer {c.admin_key}"},
+        ),
+    ),
+    Scenario(
+        "auth_secret_keys",
+        lambda r, ids, c: (
+            "GET",
+            "/auth/private/secret-keys/",
+            {"Authorization": f"Bearer {c.admin_key}"},
+        ),
+    ),
+)
+
+
+def percentile(samples: list[float], q: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def create_credentials() -> Credentials:
+    """Issue stand-in Keycloak tokens and an admin secret key for the app."""
+    provider = StubOIDCProvider(access_token_lifespan=24 * 3600)
+    jwks_cache.load(provider.jwks)
+    tokens = provider.issue_tokens()
+
+    admin_key, hashed_admin_key, _ = generate_secret_key()
+    settings.SECRET_KEY = hashed_admin_key
+
+    return Credentials(
+        cookies=(
+            f"access_token={tokens['access_token']};"
+            f" refresh_token={tokens['refresh_token']}"
+        ),
+        admin_key=admin_key,
+    )
+
+
+async def max_ids() -> dict:
+    rows = await db.query_raw(
+        "SELECT (SELECT coalesce(max(id), 1) FROM products) AS products,"
+        " (SELECT coalesce(max(id), 1) FROM orders) AS orders"
+    )
+    return rows[0]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    ids: dict,
+    credentials: Credentials,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    rng = random.Random(scenario.name)
+    latencies: list[float] = []
+    errors = 0
+    remaining = warmup + requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            measured = remaining <= requests
+            remaining -= 1
+
+            method, url, headers = scenario.build(rng, ids, credentials)
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            if measured:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    return {
+        "scenario": scenario.name,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / duration if duration else 0.0,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def main(
+    sizes: list[str],
+    scenarios: list[str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    output: Optional[str] = None,
+):
+    credentials = create_credentials()
+    results = []
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            for size_name in sizes:
+                size = SIZES[size_name]
+                print(
+                    f"Seeding {size_name}: {size.products} products,"
+                    f" {size.orders} orders, {size.customers} customers"
+                )
+                await seed(db, size)
+                await invalidate_products_cache()
+                await close_cache_backend()
+                verified_secret_keys.clear()
+                await categories_cache.refresh(db)
+                ids = await max_ids()
+
+                for scenario in SCENARIOS:
+                    if scenarios and scenario.name not in scenarios:
+                        continue
+
+                    stats = await run_scenario(
+                        client,
+                        scenario,
+                        ids,
+                        credentials,
+                        requests,
+                        concurrency,
+                        warmup,
+                    )
+                    results.append({"size": size_name, **stats})
+                    print(
+                        f"{size_name:>7} {scenario.name:<21}"
+                        f" {stats['throughput_rps']:8.1f} req/s"
+                        f"  p50 {stats['p50_ms']:7.2f} ms"
+                        f"  p95 {stats['p95_ms']:7.2f} ms"
+                        f"  p99 {stats['p99_ms']:7.2f} ms"
+                        f"  errors {stats['errors']}"
+                    )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "started_at": datetime.now(timezone.utc).isoformat(),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "requests": requests,
+                    "concurrency": concurrency,
+                    "response_cache": settings.RESPONSE_CACHE_BACKEND,
+                    "sizes": {name: vars(SIZES[name]) for name in sizes},
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["small"])
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=[scenario.name for scenario in SCENARIOS],
+        default=[],
+        help="Scenarios to run (default: all)",
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--json", dest="output", help="Write results to this file")
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(
+            args.sizes,
+            args.scenarios,
+            args.requests,
+            args.concurrency,
+            args.warmup,
+            args.output,
+        )
+    )
@@ -0,0 +1,157 @@
+"""Flash-sale checkout benchmark.
+
+Many buyers check out the same few products at once through
+`POST /orders/`, in-process, against the database in `BENCHMARK_DATABASE_URL`
+(truncated and reseeded, see `benchmarks.api`). With more than one SKU, carts
+hold several of them in random order, which would deadlock without the
+ordered stock locking.
+
+Reports throughput and latency percentiles, then checks that exactly the
+available stock was sold: no oversells, no lost units. Exits with status 1
+otherwise.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.checkout \\
+        [--buyers 1000] [--concurrency 50] [--stock 100] [--skus 1] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+# Importing the API benchmark points the settings at the benchmark database.
+from benchmarks.api import create_credentials, percentile  # isort: skip
+
+import httpx
+
+from app.config import settings
+from app.database import db
+from benchmarks.seed import SeedSize, seed
+from main import app, lifespan
+
+
+async def prepare(skus: int, stock: int, customers: int) -> tuple[list[int], list[dict]]:
+    await seed(db, SeedSize(products=skus, orders=0, customers=customers, categories=1))
+    await db.execute_raw("UPDATE products SET stock = $1::int, hidden = false", stock)
+
+    products = await db.products.find_many(order={"id": "asc"})
+    buyers = await db.customers.find_many()
+    return [p.id for p in products], [
+        {"customer_id": c.id, "address_id": c.default_address_id} for c in buyers
+    ]
+
+
+async def main(
+    buyers: int,
+    concurrency: int,
+    stock: int,
+    skus: int,
+    output: Optional[str] = None,
+) -> bool:
+    rng = random.Random(0)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    # Buyers check out through the secret key, each customer many times.
+    credentials = create_credentials()
+    settings.CHECKOUT_MAX_PENDING_ORDERS = buyers
+
+    async with lifespan(app):
+        product_ids, customers = await prepare(skus, stock, min(buyers, 100))
+        remaining = buyers
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+            headers={"Authorization": f"Bearer {credentials.admin_key}"},
+        ) as client:
+
+            async def buyer():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    cart = rng.sample(product_ids, min(len(product_ids), 2))
+                    body = {
+                        **rng.choice(customers),
+                        "payment_method": "card",
+                        "items": [{"product_id": id_, "quantity": 1} for id_ in cart],
+                    }
+
+                    start = time.perf_counter()
+                    response = await client.post("/orders/", json=body)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    statuses[response.status_code] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(buyer() for _ in range(concurrency)))
+            duration = time.perf_counter() - started
+
+        [totals] = await db.query_raw(
+            """
+            SELECT
+                (SELECT coalesce(sum(stock), 0) FROM products) AS stock,
+                (SELECT coalesce(min(stock), 0) FROM products) AS min_stock,
+                (SELECT coalesce(sum(quantity), 0) FROM order_items) AS sold,
+                (SELECT coalesce(sum(quantity), 0) FROM stock_reservations) AS reserved
+            """
+        )
+
+    initial = stock * len(product_ids)
+    consistent = (
+        totals["min_stock"] >= 0
+        and totals["stock"] + totals["sold"] == initial
+        and totals["reserved"] == totals["sold"]
+    )
+    result = {
+        "buyers": buyers,
+        "concurrency": concurrency,
+        "skus": len(product_ids),
+        "initial_stock": initial,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "units_sold": totals["sold"],
+        "stock_left": totals["stock"],
+        "consistent": consistent,
+        "throughput_rps": buyers / duration if duration else 0.0,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+    print(
+        f"{buyers} buyers, {len(product_ids)} SKU(s) x {stock} units:"
+        f" {result['throughput_rps']:.1f} req/s"
+        f"  p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms"
+        f"  p99 {result['p99_ms']:.2f} ms"
+    )
+    print(f"statuses {result['statuses']}, sold {totals['sold']}, left {totals['stock']}")
+    print("consistent" if consistent else "INCONSISTENT: stock was oversold or lost")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    return consistent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--skus", type=int, default=1)
+    parser.add_argument("--json", dest="output", help="Write results to this file")
+    args = parser.parse_args()
+
+    ok = asyncio.run(
+        main(args.buyers, args.concurrency, args.stock, args.skus, args.output)
+    )
+    sys.exit(0 if ok else 1)
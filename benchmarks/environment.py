@@ -0,0 +1,44 @@
+"""Settings shared by the benchmarks that drive the app in-process."""
+
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+
+def configure_environment():
+    """Point the settings at the benchmark database and the local stand-ins.
+
+    Must run before any `app` module is imported, since the settings are
+    loaded at import time.
+    """
+    database_url = os.environ.get("BENCHMARK_DATABASE_URL")
+    if not database_url:
+        sys.exit(
+            "Set BENCHMARK_DATABASE_URL to a disposable Postgres database;"
+            " it is truncated and reseeded by the benchmark."
+        )
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_ROOT"] = tempfile.mkdtemp(prefix="tiendify-bench-")
+    # Nothing listens there: the background JWKS refresh fails fast and keeps
+    # the stand-in keys loaded by the benchmark.
+    os.environ["KEYCLOAK_URL"] = "http://127.0.0.1:9"
+    os.environ["KEYCLOAK_REALM"] = "tiendify"
+    os.environ["KEYCLOAK_CLIENT_ID"] = "tiendify"
+    os.environ["KEYCLOAK_CLIENT_SECRET"] = "secret"
+    os.environ.setdefault("AZURE_STORAGE", "http://127.0.0.1:10000/devstoreaccount1")
+    os.environ.setdefault("AZURE_PUBLIC_CONTAINER", "public")
+    # Replaced by the hash of a generated key once the app is imported.
+    os.environ.setdefault("SECRET_KEY", "unset")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
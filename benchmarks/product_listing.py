@@ -0,0 +1,92 @@
+"""Compare the Prisma `include` product listing with the single-query path.
+
+Runs both listing implementations against the database in `DATABASE_URL`
+(which should already hold a catalog with at least 500 products) and prints
+latency percentiles per page size.
+
+Usage:
+    python -m benchmarks.product_listing [--iterations 50] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.database import db
+from app.routes.products.queries import find_products_page
+from app.routes.products.utils import (
+    parse_product_listing_rows,
+    parse_products_response_data,
+)
+
+PAGE_SIZES = (20, 100, 500)
+
+
+async def include_listing(limit: int) -> list[dict]:
+    data = await db.products.find_many(
+        include={
+            "product_categories": {"include": {"categories": True}},
+            "products_mediafiles": {"include": {"mediafiles": True}, "take": 1},
+        },
+        take=limit,
+        order={"id": "asc"},
+    )
+    return parse_products_response_data(data)
+
+
+async def lateral_listing(limit: int) -> list[dict]:
+    return parse_product_listing_rows(await find_products_page(db, limit))
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1]
+
+
+async def measure(listing, limit: int, iterations: int) -> dict:
+    await listing(limit)  # warm up
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await listing(limit)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+    }
+
+
+async def main(iterations: int, output: str = None):
+    await db.connect()
+    results = []
+    try:
+        for limit in PAGE_SIZES:
+            for name, listing in (
+                ("include", include_listing),
+                ("lateral", lateral_listing),
+            ):
+                stats = await measure(listing, limit, iterations)
+                results.append({"path": name, "page_size": limit, **stats})
+                print(
+                    f"{name:>8} {limit:>4} rows: mean {stats['mean_ms']:7.2f} ms"
+                    f"  p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms"
+                )
+    finally:
+        await db.disconnect()
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--json", dest="output", help="Write results to this file")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.iterations, args.output))
@@ -0,0 +1,189 @@
+"""Seed the database with a synthetic catalog, customers and orders.
+
+Every table is truncated first, so point `DATABASE_URL` at a disposable
+database. The data is generated in Postgres with `generate_series`, which
+keeps seeding large sizes fast.
+
+Usage:
+    python -m benchmarks.seed [--products 10000] [--orders 10000] [--customers 1000]
+"""
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass
+
+from app.database import db
+from app.routes.analytics.rollups import backfill_rollups
+from app.routes.products.search import refresh_search_vectors
+from prisma import Prisma
+
+SEEDED_TABLES = (
+    "stock_reservations",
+    "order_items",
+    "orders",
+    "payments",
+    "shipping",
+    "customers",
+    "addresses",
+    "products_mediafiles",
+    "mediafiles",
+    "product_categories",
+    "products",
+    "categories",
+    "secret_keys",
+    "daily_sales_rollups",
+    "order_status_rollups",
+    "product_sales_rollups",
+)
+
+# Customer matching the default user of the Keycloak stand-in.
+STUB_CUSTOMER_EMAIL = "jdoe@example.com"
+
+
+@dataclass
+class SeedSize:
+    products: int
+    orders: int
+    customers: int
+    categories: int = 20
+
+
+SIZES = {
+    "small": SeedSize(products=1_000, orders=1_000, customers=100),
+    "medium": SeedSize(products=10_000, orders=10_000, customers=1_000),
+    "large": SeedSize(products=100_000, orders=100_000, customers=10_000),
+}
+
+SEED_STATEMENTS = (
+    """
+    INSERT INTO categories (slug, name, description)
+    SELECT 'category-' || i, 'Category ' || i, 'Synthetic category ' || i
+    FROM generate_series(1, {categories}) AS i
+    """,
+    """
+    INSERT INTO products (name, description, price, stock, hidden, created_at)
+    SELECT
+        'Product ' || i || ' ' || (ARRAY['shirt', 'mug', 'lamp', 'chair', 'book'])[1 + i % 5],
+        repeat('Synthetic product description. ', 5 + i % 20),
+        1000 + (i * 7919) % 100000,
+        100 + i % 50,
+        i % 50 = 0,
+        now() - i * interval '1 minute'
+    FROM generate_series(1, {products}) AS i
+    """,
+    """
+    INSERT INTO product_categories (product_id, category_id)
+    SELECT id, 'category-' || (1 + id % {categories}) FROM products
+    UNION ALL
+    SELECT id, 'category-' || (1 + (id + 1) % {categories}) FROM products
+    WHERE id % 3 = 0 AND {categories} > 1
+    """,
+    """
+    INSERT INTO mediafiles (url, type)
+    SELECT 'http://localhost:8000/media/products/' || i || '.jpg', 'image/jpeg'
+    FROM generate_series(1, {products}) AS i
+    """,
+    """
+    INSERT INTO products_mediafiles (product_id, media_file_id)
+    SELECT id, id FROM products
+    """,
+    """
+    INSERT INTO addresses (address_label, city, state, zip_code, country)
+    SELECT 'Street ' || i, 'City ' || i % 100, 'State ' || i % 10, lpad((i % 100000)::text, 5, '0'), 'CO'
+    FROM generate_series(1, {customers}) AS i
+    """,
+    """
+    INSERT INTO customers (first_name, last_name, email, password, phone, default_address_id, created_at)
+    SELECT
+        CASE WHEN i = 1 THEN 'John' ELSE 'Customer' END,
+        CASE WHEN i = 1 THEN 'Doe' ELSE i::text END,
+        CASE WHEN i = 1 THEN '{stub_email}' ELSE 'customer' || i || '@example.com' END,
+        'not-a-password',
+        '+57300' || lpad(i::text, 7, '0'),
+        i,
+        now() - i * interval '1 hour'
+    FROM generate_series(1, {customers}) AS i
+    """,
+    """
+    INSERT INTO payments (amount, method, status, paid_at)
+    SELECT 1000 + (i * 104729) % 500000, 'card', 'PAID', now() - i * interval '1 minute'
+    FROM generate_series(1, {orders}) AS i
+    """,
+    """
+    INSERT INTO shipping (address_id, status, estimated_delivery)
+    SELECT 1 + i % {customers}, 'PENDING', 3 + i % 5
+    FROM generate_series(1, {orders}) AS i
+    """,
+    """
+    INSERT INTO orders (customer_id, shipping_id, payment_id, ordered_at)
+    SELECT c.id, s.id, p.id, now() - p.n * interval '1 minute'
+    FROM (SELECT id, row_number() OVER () AS n FROM payments) AS p
+    JOIN (SELECT id, row_number() OVER () AS n FROM shipping) AS s USING (n)
+    JOIN (SELECT id, row_number() OVER () AS n FROM customers) AS c
+        ON c.n = 1 + p.n % {customers}
+    """,
+    """
+    INSERT INTO order_items (order_id, product_id, quantity)
+    SELECT id, 1 + id % {products}, 1 + id % 3 FROM orders
+    UNION ALL
+    SELECT id, 1 + (id * 31) % {products}, 1 FROM orders WHERE id % 2 = 0
+    """,
+)
+
+
+async def reset(shop_db: Prisma) -> None:
+    """Truncate every seeded table and restart their id sequences."""
+    await shop_db.execute_raw(
+        f"TRUNCATE {', '.join(SEEDED_TABLES)} RESTART IDENTITY CASCADE"
+    )
+
+
+async def seed(shop_db: Prisma, size: SeedSize) -> None:
+    """Replace the database content with synthetic rows.
+
+    Args:
+        shop_db (Prisma): Connected database client.
+        size (SeedSize): Number of rows to generate per entity.
+    """
+    if size.products < 1 or size.customers < 1 or size.categories < 1:
+        raise ValueError("At least one product, customer and category is required")
+
+    await reset(shop_db)
+
+    for statement in SEED_STATEMENTS:
+        await shop_db.execute_raw(
+            statement.format(**asdict(size), stub_email=STUB_CUSTOMER_EMAIL)
+        )
+
+    await refresh_search_vectors(shop_db)
+    await backfill_rollups(shop_db)
+    await shop_db.execute_raw("ANALYZE")
+
+
+async def main(size: SeedSize):
+    await db.connect()
+    try:
+        await seed(db, size)
+        print(
+            f"Seeded {size.products} products, {size.orders} orders"
+            f" and {size.customers} customers"
+        )
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--categories", type=int)
+    args = parser.parse_args()
+
+    overrides = {
+        name: value
+        for name in ("products", "orders", "customers", "categories")
+        if (value := getattr(args, name)) is not None
+    }
+    asyncio.run(main(SeedSize(**{**asdict(SIZES[args.size]), **overrides})))
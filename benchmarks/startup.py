@@ -0,0 +1,194 @@
+"""Cold start benchmark.
+
+Starts the app several times, each in a fresh Python process, against the
+database in `BENCHMARK_DATABASE_URL` (with the same local stand-ins as
+`benchmarks.api`), and measures:
+
+- the import time of `main`, and the slowest modules it imports;
+- the lifespan startup time, with the duration of each warm-up step;
+- the latency of the first and second request to a few routes.
+
+The database is left as is; seed it first with `benchmarks.seed` (or
+`--size`) to measure a realistic catalog.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.startup \\
+        [--runs 5] [--size small] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from benchmarks.environment import configure_environment, git_commit
+
+ROUTES = ("/health/ready", "/categories/categories", "/products/?limit=20")
+
+
+async def measure_child() -> dict:
+    """Measure one cold start of the app in the current process."""
+    start = time.perf_counter()
+    from main import app, lifespan
+
+    import_s = time.perf_counter() - start
+
+    import httpx
+
+    from app.core.startup import warmup
+
+    requests = {}
+
+    start = time.perf_counter()
+    async with lifespan(app):
+        startup_s = time.perf_counter() - start
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+        ) as client:
+            for route in ROUTES:
+                latencies = []
+                for _ in range(2):
+                    start = time.perf_counter()
+                    response = await client.get(route)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                requests[route] = {
+                    "status": response.status_code,
+                    "first_ms": latencies[0],
+                    "second_ms": latencies[1],
+                }
+
+    return {
+        "import_s": import_s,
+        "startup_s": startup_s,
+        "warmup_s": warmup.durations,
+        "requests": requests,
+    }
+
+
+def slowest_imports(limit: int = 10) -> list[dict]:
+    """Import `main` in a fresh process and return its slowest top-level
+    imports, by cumulative time."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        # Imports of `main` are indented one level (two spaces) below it.
+        if name.startswith("   ") and not name.startswith("     "):
+            modules.append(
+                {"module": name.strip(), "cumulative_ms": int(cumulative) / 1000}
+            )
+
+    return sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:limit]
+
+
+def run_child() -> dict:
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def median(runs: list[dict], *path: str) -> float:
+    values = []
+    for run in runs:
+        value = run
+        for key in path:
+            value = value.get(key, {}) if isinstance(value, dict) else {}
+        if isinstance(value, (int, float)):
+            values.append(value)
+    return statistics.median(values) if values else 0.0
+
+
+def main(runs: int, size: Optional[str], output: Optional[str] = None):
+    if size:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.seed", "--size", size], check=True
+        )
+
+    samples = [run_child() for _ in range(runs)]
+    steps = sorted({step for sample in samples for step in sample["warmup_s"]})
+
+    result = {
+        "import_s": median(samples, "import_s"),
+        "startup_s": median(samples, "startup_s"),
+        "warmup_s": {step: median(samples, "warmup_s", step) for step in steps},
+        "requests": {
+            route: {
+                "first_ms": median(samples, "requests", route, "first_ms"),
+                "second_ms": median(samples, "requests", route, "second_ms"),
+            }
+            for route in ROUTES
+        },
+        "slowest_imports": slowest_imports(),
+    }
+
+    print(f"median of {runs} cold starts")
+    print(f"import main      {result['import_s'] * 1000:8.1f} ms")
+    print(f"lifespan startup {result['startup_s'] * 1000:8.1f} ms")
+    for step, seconds in result["warmup_s"].items():
+        print(f"  warm-up {step:<8} {seconds * 1000:8.1f} ms")
+    for route, latency in result["requests"].items():
+        print(
+            f"GET {route:<24} first {latency['first_ms']:8.2f} ms"
+            f"  second {latency['second_ms']:8.2f} ms"
+        )
+    print("slowest imports:")
+    for module in result["slowest_imports"]:
+        print(f"  {module['module']:<40} {module['cumulative_ms']:8.1f} ms")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "started_at": datetime.now(timezone.utc).isoformat(),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "runs": runs,
+                    "results": result,
+                    "samples": samples,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--size",
+        choices=("small", "medium", "large"),
+        help="Reseed the database with this size first",
+    )
+    parser.add_argument("--json", dest="output", help="Write results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child processes inherit the settings, including the temporary media root.
+    configure_environment()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure_child())))
+    else:
+        main(args.runs, args.size, args.output)
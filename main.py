@@ -1,37 +1,69 @@
+import asyncio
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
-from app.database import db
+from app.core.cache.responses import close_cache_backend
+from app.core.metrics import MetricsMiddleware, instrument_prisma, render_metrics
+from app.core.security import jwks_cache, valid_metrics_token
+from app.core.startup import warmup
+from app.database import db, read_db, tenant_pool
+from app.database.routing import ReadYourWritesMiddleware
+from app.database.tenancy import TenantMiddleware
+from app.routes.analytics import router as analytics_router
 from app.routes.auth.private_routes import router as private_auth_router
 from app.routes.auth.public_routes import router as public_auth_router
 from app.routes.auth.secret_keys import router as secret_key_router
 from app.routes.categories import router as category_router
 from app.routes.customers import router as customer_router
 from app.routes.orders import router as order_router
+from app.routes.orders.checkout import reservation_sweeper
 from app.routes.products import router as product_router
+from app.services.images import shutdown_executor
+from app.services.keycloak import close_keycloak
+from app.services.storage import close_storage
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Controls the lifespan of the application. Initializes and closes the database connection.
+    """Controls the lifespan of the application. Warms up the instance (database connection,
+    or the per-shop client pool in multi-tenant mode, JWKS signing keys and catalog caches),
+    runs the background refresh of the JWKS signing keys and the release of expired stock
+    reservations, and closes every client on shutdown.
 
     Args:
         app (FastAPI): The FastAPI application instance.
     """
-    await db.connect()
-    print("Connected to database")
+    await warmup.run()
+    jwks_cache.start()
+    reservation_sweeper.start()
     yield
-    await db.disconnect()
+    warmup.done = False
+    await reservation_sweeper.stop()
+    await jwks_cache.stop()
+    # Waits for the images being rendered, without blocking the event loop.
+    await asyncio.to_thread(shutdown_executor)
+    await close_keycloak()
+    await close_storage()
+    await close_cache_backend()
+    await tenant_pool.stop()
+    if db.is_connected():
+        await db.disconnect()
+    if read_db is not None and read_db.is_connected():
+        await read_db.disconnect()
 
 
-app = FastAPI()
+instrument_prisma()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -40,14 +72,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+
+if read_db is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.TENANCY_MODE != "single":
+    if not settings.TENANT_DATABASE_URL_TEMPLATE:
+        raise RuntimeError("TENANT_DATABASE_URL_TEMPLATE is required by TENANCY_MODE")
+    app.add_middleware(TenantMiddleware)
 
 
 @app.get("/health")
+@app.get("/health/live")
 def handle_get_health():
     return {"status": "ok"}
 
 
+@app.get("/health/ready")
+async def handle_get_readiness():
+    ready, checks = await warmup.readiness()
+    return ORJSONResponse(
+        {"status": "ok" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+
+if settings.METRICS_TOKEN:
+
+    @app.get(
+        "/metrics",
+        include_in_schema=False,
+        dependencies=[Depends(valid_metrics_token)],
+    )
+    def handle_get_metrics():
+        content, content_type = render_metrics()
+        return Response(content=content, media_type=content_type)
+
+
 app.include_router(public_auth_router, prefix="/auth/public")
 app.include_router(private_auth_router, prefix="/auth/private")
 app.include_router(secret_key_router, prefix="/auth/private/secret-keys")
@@ -56,3 +120,8 @@ app.include_router(category_router, prefix="/categories")
 app.include_router(product_router, prefix="/products")
 app.include_router(order_router, prefix="/orders")
 app.include_router(customer_router, prefix="/customers")
+app.include_router(analytics_router, prefix="/analytics")
+
+if settings.STORAGE_BACKEND == "local":
+    os.makedirs(settings.STORAGE_LOCAL_ROOT, exist_ok=True)
+    app.mount("/media", StaticFiles(directory=settings.STORAGE_LOCAL_ROOT), name="media")
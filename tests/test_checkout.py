@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.config import settings
+from app.models.orders import OrderCreate
+from app.routes.customers.utils import customers_cache
+from app.routes.orders import router as order_router
+from app.routes.orders.checkout import check_pending_orders, get_checkout_customer
+
+CUSTOMER = SimpleNamespace(id=str(uuid4()), email="ana@example.com")
+
+
+class FakeTable:
+    def __init__(self, **methods):
+        for name, result in methods.items():
+
+            async def method(*args, result=result, **kwargs):
+                return result
+
+            setattr(self, name, method)
+
+
+def fake_db():
+    return SimpleNamespace(customers=FakeTable(find_unique=CUSTOMER))
+
+
+def checkout(customer_id=None) -> OrderCreate:
+    return OrderCreate(
+        customer_id=customer_id,
+        payment_method="card",
+        items=[{"product_id": 1, "quantity": 1}],
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_customers():
+    customers_cache.clear()
+
+
+def get_customer(data, token_data, admin):
+    return asyncio.run(get_checkout_customer(fake_db(), data, token_data, admin))
+
+
+def test_anonymous_checkout_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        get_customer(checkout(CUSTOMER.id), False, False)
+
+    assert error.value.status_code == 403
+
+
+def test_customers_order_for_themselves():
+    token_data = {"email": CUSTOMER.email}
+
+    assert get_customer(checkout(), token_data, False) is CUSTOMER
+    assert get_customer(checkout(CUSTOMER.id), token_data, False) is CUSTOMER
+
+    with pytest.raises(HTTPException) as error:
+        get_customer(checkout(uuid4()), token_data, False)
+    assert error.value.status_code == 403
+
+
+def test_secret_key_checkout_requires_a_customer():
+    assert get_customer(checkout(CUSTOMER.id), False, True) is CUSTOMER
+
+    with pytest.raises(HTTPException) as error:
+        get_customer(checkout(), False, True)
+    assert error.value.status_code == 400
+
+
+def test_pending_orders_are_counted_under_the_customer_lock():
+    calls = []
+
+    async def query_raw(sql, *args):
+        calls.append(("lock", args))
+
+    async def count(where):
+        calls.append(("count", where["customer_id"]))
+        return settings.CHECKOUT_MAX_PENDING_ORDERS - 1
+
+    tx = SimpleNamespace(query_raw=query_raw, orders=SimpleNamespace(count=count))
+    asyncio.run(check_pending_orders(tx, CUSTOMER.id))
+
+    assert calls == [("lock", (CUSTOMER.id,)), ("count", CUSTOMER.id)]
+
+
+def test_pending_orders_are_limited_per_customer():
+    async def query_raw(sql, *args):
+        pass
+
+    async def count(where):
+        return settings.CHECKOUT_MAX_PENDING_ORDERS
+
+    tx = SimpleNamespace(query_raw=query_raw, orders=SimpleNamespace(count=count))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(check_pending_orders(tx, CUSTOMER.id))
+    assert error.value.status_code == 429
+
+
+def test_anonymous_confirm_is_rejected():
+    app = FastAPI()
+    app.include_router(order_router, prefix="/orders")
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            return await client.post("/orders/1/confirm")
+
+    assert asyncio.run(run()).status_code == 403
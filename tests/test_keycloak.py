@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.keycloak import KeycloakClient, KeycloakError
+
+
+def client_answering(*answers) -> tuple[KeycloakClient, list]:
+    """Keycloak client whose requests get `answers` in order: a status code,
+    or an exception raised before the request is sent."""
+    grants = []
+    answers = iter(answers)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        grants.append(dict(httpx.QueryParams(request.content.decode()))["grant_type"])
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return httpx.Response(answer, json={"access_token": "token"})
+
+    client = KeycloakClient(
+        "http://keycloak",
+        "realm",
+        "client",
+        "secret",
+        max_retries=2,
+        backoff=0,
+        transport=httpx.MockTransport(handler),
+    )
+    return client, grants
+
+
+def test_password_grant_is_retried_on_gateway_errors():
+    client, grants = client_answering(504, 503, 200)
+
+    assert asyncio.run(client.token("password", username="a", password="b"))
+    assert grants == ["password"] * 3
+
+
+def test_authorization_code_is_not_replayed_after_a_response():
+    client, grants = client_answering(504, 200)
+
+    with pytest.raises(KeycloakError):
+        asyncio.run(client.token("authorization_code", code="code"))
+    assert grants == ["authorization_code"]
+
+
+def test_authorization_code_is_retried_when_never_sent():
+    client, grants = client_answering(httpx.ConnectError("refused"), 200)
+
+    assert asyncio.run(client.token("authorization_code", code="code"))
+    assert grants == ["authorization_code"] * 2
@@ -0,0 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.routes.orders import export
+
+START = datetime(2024, 5, 1)
+
+
+def test_export_borrows_a_client_until_the_last_batch(monkeypatch):
+    orders = [
+        SimpleNamespace(id=id_, ordered_at=START - timedelta(hours=id_))
+        for id_ in range(1, 6)
+    ]
+    events = []
+
+    async def find_many(where, take, **kwargs):
+        events.append("query")
+        after = len([event for event in events if event == "query"]) - 1
+        return orders[after * take : (after + 1) * take]
+
+    @asynccontextmanager
+    async def use_read_db(tenant, primary):
+        events.append(("borrow", tenant, primary))
+        yield SimpleNamespace(orders=SimpleNamespace(find_many=find_many))
+        events.append("release")
+
+    monkeypatch.setattr(export, "use_read_db", use_read_db)
+
+    async def run():
+        batches = []
+        async for batch in export.iter_order_batches("acme", None, None, 2):
+            batches.append([order.id for order in batch])
+            events.append("batch")
+        return batches
+
+    assert asyncio.run(run()) == [[1, 2], [3, 4], [5]]
+    assert events == [
+        ("borrow", "acme", False),
+        "query",
+        "batch",
+        "query",
+        "batch",
+        "query",
+        "batch",
+        "release",
+    ]
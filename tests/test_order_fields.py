@@ -0,0 +1,81 @@
+import pytest
+from fastapi import HTTPException
+
+from app.routes.orders.fields import order_projection
+
+LIST_EXPAND = ("payments", "shipping")
+
+
+def test_defaults_expand_default_relations():
+    include, serialized = order_projection(None, None, LIST_EXPAND)
+
+    assert include == {"payments": True, "shipping": True}
+    assert set(serialized) == {
+        "id",
+        "customer_id",
+        "shipping_id",
+        "payment_id",
+        "ordered_at",
+        "payments",
+        "shipping",
+    }
+
+
+def test_fields_only_expand_named_relations():
+    include, serialized = order_projection(
+        "id,ordered_at,payments.status", None, LIST_EXPAND
+    )
+
+    assert include == {"payments": True}
+    assert serialized == {"id": True, "ordered_at": True, "payments": {"status": True}}
+
+
+def test_fields_without_relations_expand_nothing():
+    include, serialized = order_projection("ordered_at", None, LIST_EXPAND)
+
+    assert include is None
+    assert serialized == {"id": True, "ordered_at": True}
+
+
+def test_empty_expand_expands_nothing():
+    include, serialized = order_projection(None, "", LIST_EXPAND)
+
+    assert include is None
+    assert "payments" not in serialized
+
+
+def test_nested_relation_expands_its_parent():
+    include, serialized = order_projection(
+        "id,shipping.addresses.city", None, LIST_EXPAND
+    )
+
+    assert include == {"shipping": {"include": {"addresses": True}}}
+    assert serialized["shipping"]["addresses"] == {"city": True}
+    # The parent was only expanded to reach the nested relation.
+    assert "status" in serialized["shipping"]
+
+
+def test_list_relations_apply_to_every_item():
+    _, serialized = order_projection("id", "order_items", ())
+
+    assert set(serialized["order_items"]) == {"__all__"}
+
+
+def test_customer_password_is_never_serialized():
+    _, serialized = order_projection(None, "customers", ())
+
+    assert "password" not in serialized["customers"]
+
+    with pytest.raises(HTTPException) as error:
+        order_projection("customers.password", None, ())
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "fields, expand", [("password", None), (None, "orders"), (None, "shipping.orders")]
+)
+def test_unknown_fields_and_relations_are_rejected(fields, expand):
+    with pytest.raises(HTTPException) as error:
+        order_projection(fields, expand, ())
+
+    assert error.value.status_code == 400
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import (
+    decode_cursor,
+    decode_datetime_cursor,
+    encode_cursor,
+    keyset_after_desc,
+)
+
+ORDERED_AT = datetime(2024, 5, 1, 12, 30)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(42, "abc")
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [42, "abc"]
+
+
+def test_datetime_cursor_round_trip():
+    assert decode_datetime_cursor(encode_cursor(ORDERED_AT, 7)) == (ORDERED_AT, 7)
+    assert decode_datetime_cursor(encode_cursor(None, "7"), str) == (None, "7")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["not base64!", encode_cursor(1), encode_cursor(1, 2, 3), "eyJ0eXBlIjoxfQ"],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+
+    assert error.value.status_code == 400
+
+
+def test_datetime_cursor_rejects_bad_values():
+    with pytest.raises(HTTPException):
+        decode_datetime_cursor(encode_cursor("yesterday", 1))
+
+    with pytest.raises(HTTPException):
+        decode_datetime_cursor(encode_cursor(ORDERED_AT, "x"), int)
+
+
+def test_keyset_after_desc():
+    assert keyset_after_desc("ordered_at", ORDERED_AT, 7) == {
+        "OR": [
+            {"ordered_at": {"lt": ORDERED_AT}},
+            {"ordered_at": ORDERED_AT, "id": {"lt": 7}},
+        ]
+    }
+
+
+def test_keyset_after_desc_from_null_timestamps():
+    # NULLs sort first in descending order, so every non-NULL row comes after.
+    assert keyset_after_desc("ordered_at", None, 7) == {
+        "OR": [
+            {"ordered_at": None, "id": {"lt": 7}},
+            {"ordered_at": {"not": None}},
+        ]
+    }
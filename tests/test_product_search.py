@@ -0,0 +1,31 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.routes.products import search
+
+
+def test_stored_text_is_escaped_before_it_is_highlighted():
+    queries = []
+
+    async def query_raw(sql, *args):
+        queries.append(sql)
+        return []
+
+    shop_db = SimpleNamespace(query_raw=query_raw)
+    asyncio.run(search.search_products(shop_db, "cotton", 10, 0))
+
+    assert f"ts_headline($1::regconfig, {search.escape_html_sql('p.name')}," in (
+        queries[0]
+    )
+    assert (
+        f"ts_headline($1::regconfig, {search.escape_html_sql('p.description')},"
+        in queries[0]
+    )
+
+
+def test_ampersands_are_escaped_first():
+    expected = (
+        "replace(replace(replace(p.name, '&', '&amp;'), '<', '&lt;'), '>', '&gt;')"
+    )
+
+    assert search.escape_html_sql("p.name") == expected
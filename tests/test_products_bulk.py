@@ -0,0 +1,191 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.products import ProductBulkUpdateRow
+from app.routes.products import bulk
+from prisma.errors import PrismaError
+
+
+async def body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(rows) -> list:
+    return [row async for row in rows]
+
+
+def parse_csv(*chunks: bytes, **kwargs) -> list:
+    return asyncio.run(collect(bulk.iter_csv_rows(body(*chunks), **kwargs)))
+
+
+def test_csv_rows_are_parsed_across_chunks():
+    rows = parse_csv(
+        b"name,price,description,stock,categories\r\nT-sh",
+        b"irt,25000,Cotton,100,clothing| summer\r\n\r\nCap,9000,Wool,5,\r\n",
+    )
+
+    assert rows == [
+        (
+            2,
+            {
+                "name": "T-shirt",
+                "price": "25000",
+                "description": "Cotton",
+                "stock": "100",
+                "categories": ["clothing", "summer"],
+            },
+        ),
+        (
+            4,
+            {
+                "name": "Cap",
+                "price": "9000",
+                "description": "Wool",
+                "stock": "5",
+                "categories": [],
+            },
+        ),
+    ]
+
+
+def test_csv_quoted_fields_can_span_lines():
+    rows = parse_csv(
+        b'name,description\n"Mug","Holds ""hot""\n',
+        b'drinks\n\nand soup"\nPlate,Flat\n',
+    )
+
+    assert rows == [
+        (
+            2,
+            {
+                "name": "Mug",
+                "description": 'Holds "hot"\ndrinks\n\nand soup',
+                "categories": [],
+            },
+        ),
+        (6, {"name": "Plate", "description": "Flat", "categories": []}),
+    ]
+
+
+def test_csv_reports_bad_rows():
+    rows = parse_csv(
+        b'name,description\nMug\n"Plate,never closed\n' + b"x" * 64 + b"\n",
+        max_record_size=32,
+    )
+
+    assert rows == [(2, "Expected 2 columns, got 1"), (3, "Unterminated quoted field")]
+
+
+def test_import_reports_batches_that_cannot_be_inserted(monkeypatch):
+    inserted = []
+
+    async def insert_products_batch(shop_db, products):
+        if any(p.name == "Broken" for p in products):
+            raise PrismaError("connection lost")
+        inserted.extend(p.name for p in products)
+        return list(range(len(products)))
+
+    async def find_many():
+        return [SimpleNamespace(slug="mugs")]
+
+    monkeypatch.setattr(bulk, "insert_products_batch", insert_products_batch)
+    shop_db = SimpleNamespace(categories=SimpleNamespace(find_many=find_many))
+
+    async def rows():
+        for line_number, name in enumerate(["Mug", "Broken", "Cup", "Plate"], 2):
+            yield line_number, {
+                "name": name,
+                "price": 1,
+                "description": "",
+                "stock": 1,
+                "categories": ["mugs"],
+            }
+
+    report = asyncio.run(bulk.import_products(shop_db, rows(), batch_size=2))
+
+    assert inserted == ["Cup", "Plate"]
+    assert report["imported"] == 2
+    assert report["failed"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    # The database error is logged, not sent to the client.
+    assert report["errors"][0]["errors"] == [
+        {"field": None, "message": "Could not insert the batch of rows 2-3"}
+    ]
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Record the batches passed to `update_products_batch`, as if every
+    product but 404 existed."""
+    batches = []
+
+    async def update_products_batch(shop_db, rows):
+        batches.append([row.model_dump() for row in rows])
+        return [row.id for row in rows if row.id != 404]
+
+    monkeypatch.setattr(bulk, "update_products_batch", update_products_batch)
+    return batches
+
+
+def test_bulk_update_merges_rows_of_the_same_product(batches):
+    rows = [
+        ProductBulkUpdateRow(id=2, price=100, stock=5),
+        ProductBulkUpdateRow(id=1, hidden=True),
+        ProductBulkUpdateRow(id=2, stock=8),
+    ]
+
+    updated, missing = asyncio.run(bulk.bulk_update_products(None, rows, 10))
+
+    assert (updated, missing) == ([1, 2], [])
+    assert batches == [
+        [
+            {"id": 1, "price": None, "stock": None, "hidden": True},
+            {"id": 2, "price": 100, "stock": 8, "hidden": None},
+        ]
+    ]
+
+
+def test_bulk_update_splits_batches_and_reports_missing(batches):
+    rows = [ProductBulkUpdateRow(id=id_, stock=1) for id_ in (5, 404, 1, 3, 2)]
+
+    updated, missing = asyncio.run(bulk.bulk_update_products(None, rows, 2))
+
+    assert (updated, missing) == ([1, 2, 3, 5], [404])
+    assert [[row["id"] for row in batch] for batch in batches] == [[1, 2], [3, 5], [404]]
+
+
+def test_bulk_update_never_sets_a_negative_stock():
+    executed = []
+
+    async def query_raw(sql, ids):
+        return [{"id": int(id_)} for id_ in ids.split(",")]
+
+    async def execute_raw(sql, *params):
+        executed.append((sql, params))
+
+    @asynccontextmanager
+    async def tx(timeout):
+        yield SimpleNamespace(query_raw=query_raw, execute_raw=execute_raw)
+
+    rows = [ProductBulkUpdateRow(id=1, stock=2)]
+    ids = asyncio.run(bulk.update_products_batch(SimpleNamespace(tx=tx), rows))
+
+    [(sql, params)] = executed
+    assert ids == [1]
+    assert params == (1, None, 2, None)
+    # Fewer units on hand than are reserved leave no stock, not a negative one.
+    sql = " ".join(sql.split())
+    assert "stock = coalesce( greatest( v.stock - (" in sql
+    assert "WHERE r.product_id = p.id ), 0 ), p.stock )" in sql
+
+
+def test_bulk_update_rejects_fractional_prices():
+    assert ProductBulkUpdateRow(id=1, price=25000.0).price == 25000
+
+    with pytest.raises(ValidationError):
+        ProductBulkUpdateRow(id=1, price=25000.5)
@@ -0,0 +1,124 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request, Response
+
+from app.core.cache import responses
+from app.core.cache.responses import MemoryCacheBackend, ResponseCache
+from app.database import db
+
+
+def make_request(path: str = "/products/", query: bytes = b"limit=20") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query,
+            "headers": [],
+        }
+    )
+
+
+class Loader:
+    """Builds numbered responses, recording the client each one used."""
+
+    def __init__(self, status_code: int = 200, delay: float = 0):
+        self.status_code = status_code
+        self.delay = delay
+        self.clients = []
+
+    async def __call__(self, shop_db) -> Response:
+        self.clients.append(shop_db)
+        await asyncio.sleep(self.delay)
+        return Response(
+            content=str(len(self.clients)).encode(), status_code=self.status_code
+        )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(responses, "time", SimpleNamespace(time=lambda: clock.now))
+    monkeypatch.setattr(responses, "_backend", MemoryCacheBackend())
+    return clock
+
+
+def fetch(cache, loader, tags=("listing",), request=None, shop_db="request-client"):
+    return cache.fetch(request or make_request(), shop_db, list(tags), loader)
+
+
+def test_responses_are_cached_until_a_tag_is_invalidated(clock):
+    cache, loader = ResponseCache("test", ttl=5, stale_ttl=30), Loader()
+
+    async def run():
+        first = await fetch(cache, loader)
+        second = await fetch(cache, loader, request=make_request(query=b"limit=20&x="))
+        await cache.invalidate("listing")
+        third = await fetch(cache, loader)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+
+    assert (first.headers["X-Cache"], first.body) == ("MISS", b"1")
+    # Empty query parameters do not change the key.
+    assert (second.headers["X-Cache"], second.body) == ("HIT", b"1")
+    assert (third.headers["X-Cache"], third.body) == ("MISS", b"2")
+
+
+def test_other_tags_are_not_affected(clock):
+    cache, loader = ResponseCache("test"), Loader()
+
+    async def run():
+        await fetch(cache, loader, tags=["product:1"])
+        await cache.invalidate("product:2")
+        return await fetch(cache, loader, tags=["product:1"])
+
+    assert asyncio.run(run()).headers["X-Cache"] == "HIT"
+
+
+def test_concurrent_misses_run_the_loader_once(clock):
+    cache, loader = ResponseCache("test"), Loader(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(*(fetch(cache, loader) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(loader.clients) == 1
+    assert {response.body for response in results} == {b"1"}
+
+
+def test_errors_are_not_cached(clock):
+    cache, loader = ResponseCache("test"), Loader(status_code=404)
+
+    async def run():
+        await fetch(cache, loader)
+        return await fetch(cache, loader)
+
+    assert asyncio.run(run()).headers["X-Cache"] == "MISS"
+    assert len(loader.clients) == 2
+
+
+def test_stale_entries_are_refreshed_with_their_own_client(clock):
+    cache, loader = ResponseCache("test", ttl=5, stale_ttl=30), Loader()
+
+    async def run():
+        await fetch(cache, loader)
+        clock.now += 10
+        stale = await fetch(cache, loader)
+        await asyncio.gather(*cache._refreshing)
+        fresh = await fetch(cache, loader)
+        clock.now += 60
+        expired = await fetch(cache, loader)
+        return stale, fresh, expired
+
+    stale, fresh, expired = asyncio.run(run())
+
+    assert (stale.headers["X-Cache"], stale.body) == ("STALE", b"1")
+    assert (fresh.headers["X-Cache"], fresh.body) == ("HIT", b"2")
+    assert (expired.headers["X-Cache"], expired.body) == ("MISS", b"3")
+    # The request's client may be gone once its response is sent, so the
+    # background refresh borrows one instead.
+    assert loader.clients == ["request-client", db, "request-client"]
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.security.utils import generate_secret_key
+
+
+class FakeSecretKeys:
+    """Stands in for `SecretKeyValue.prisma(shop_db)` on a list of rows."""
+
+    def __init__(self):
+        self.rows = []
+        self.lookups = 0
+
+    def prisma(self, shop_db):
+        return self
+
+    async def find_many(self, where):
+        self.lookups += 1
+        return [
+            row
+            for row in self.rows
+            if row.prefix == where["prefix"] and row.enabled == where["enabled"]
+        ]
+
+
+@pytest.fixture
+def secret_keys(monkeypatch):
+    fake = FakeSecretKeys()
+    monkeypatch.setattr(security, "SecretKeyValue", fake)
+    monkeypatch.setattr(security.settings, "SECRET_KEY", generate_secret_key()[1])
+    security.verified_secret_keys.clear()
+    return fake
+
+
+def check(secret_key: str) -> bool:
+    return asyncio.run(security.SecretKeyAccessChecker()(secret_key, None))
+
+
+def test_verified_keys_are_rejected_once_deleted(secret_keys, monkeypatch):
+    secret_key, hashed, prefix = generate_secret_key()
+    secret_keys.rows.append(
+        SimpleNamespace(prefix=prefix, secret_key=hashed, enabled=True)
+    )
+
+    assert check(secret_key)
+
+    verify = security.secret_key_context.verify
+    verifications = []
+    monkeypatch.setattr(
+        security.secret_key_context,
+        "verify",
+        lambda *args: verifications.append(args) or verify(*args),
+    )
+
+    # Cached: the row is still looked up, but bcrypt is skipped.
+    assert check(secret_key)
+    assert secret_keys.lookups == 2
+    assert not verifications
+
+    secret_keys.rows.clear()
+    with pytest.raises(HTTPException) as error:
+        check(secret_key)
+    assert error.value.status_code == 403
+
+
+def test_disabled_keys_are_rejected(secret_keys):
+    secret_key, hashed, prefix = generate_secret_key()
+    row = SimpleNamespace(prefix=prefix, secret_key=hashed, enabled=True)
+    secret_keys.rows.append(row)
+
+    assert check(secret_key)
+
+    row.enabled = False
+    with pytest.raises(HTTPException):
+        check(secret_key)
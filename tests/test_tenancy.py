@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from app.database import tenancy
+from app.database.tenancy import (
+    TenantClientPool,
+    current_tenant,
+    resolve_tenant,
+    tenant_key,
+    with_connection_limit,
+)
+
+
+class FakePrisma:
+    def __init__(self, datasource: dict):
+        self.url = datasource["url"]
+        self.connects = 0
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self):
+        await asyncio.sleep(0)
+        self.connects += 1
+        self._connected = True
+
+    async def disconnect(self):
+        self._connected = False
+
+
+@pytest.fixture(autouse=True)
+def fake_prisma(monkeypatch):
+    monkeypatch.setattr(tenancy, "Prisma", FakePrisma)
+
+
+def make_pool(**kwargs) -> TenantClientPool:
+    return TenantClientPool("postgresql://db/shop_{tenant}", **kwargs)
+
+
+async def borrow(pool: TenantClientPool, tenant: str) -> FakePrisma:
+    async with pool.client(tenant) as client:
+        return client
+
+
+def test_concurrent_requests_share_one_client():
+    pool = make_pool(connection_limit=3)
+
+    async def run():
+        return await asyncio.gather(*(borrow(pool, "acme") for _ in range(5)))
+
+    clients = asyncio.run(run())
+
+    assert len({id(client) for client in clients}) == 1
+    assert clients[0].connects == 1
+    assert clients[0].url == "postgresql://db/shop_acme?connection_limit=3"
+
+
+def test_least_recently_used_client_is_evicted():
+    pool = make_pool(maxsize=2)
+
+    async def run():
+        a = await borrow(pool, "a")
+        await borrow(pool, "b")
+        await borrow(pool, "a")
+        await borrow(pool, "c")
+        return a
+
+    a = asyncio.run(run())
+
+    assert [tenant for tenant, _ in pool.connected()] == ["a", "c"]
+    assert a.is_connected()
+
+
+def test_borrowed_clients_are_not_evicted():
+    pool = make_pool(maxsize=1)
+
+    async def run():
+        async with pool.client("busy") as busy:
+            await borrow(pool, "other")
+            still_connected = busy.is_connected()
+        await borrow(pool, "last")
+        return still_connected, busy.is_connected()
+
+    assert asyncio.run(run()) == (True, False)
+    assert [tenant for tenant, _ in pool.connected()] == ["last"]
+
+
+def test_close_idle_skips_borrowed_clients():
+    pool = make_pool(idle_timeout=0)
+
+    async def run():
+        await borrow(pool, "idle")
+        async with pool.client("busy"):
+            closed = await pool.close_idle()
+            connected = [tenant for tenant, _ in pool.connected()]
+        await pool.stop()
+        return closed, connected
+
+    assert asyncio.run(run()) == (1, ["busy"])
+    assert pool.connected() == []
+
+
+def test_connection_limit_keeps_an_explicit_one():
+    assert with_connection_limit("postgresql://db/x?connection_limit=9", 2) == (
+        "postgresql://db/x?connection_limit=9"
+    )
+
+
+def test_resolve_tenant_from_header(monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "TENANCY_MODE", "header")
+
+    assert resolve_tenant({"headers": [(b"x-tenant-id", b" Acme ")]}) == "acme"
+    assert resolve_tenant({"headers": [(b"x-tenant-id", b"../etc")]}) is None
+    assert resolve_tenant({"headers": []}) is None
+
+
+def test_resolve_tenant_from_host(monkeypatch):
+    monkeypatch.setattr(tenancy.settings, "TENANCY_MODE", "host")
+    monkeypatch.setattr(tenancy.settings, "TENANT_BASE_DOMAIN", "tiendify.shop")
+
+    assert resolve_tenant({"headers": [(b"host", b"acme.tiendify.shop:443")]}) == "acme"
+    assert resolve_tenant({"headers": [(b"host", b"acme.example.com")]}) is None
+
+
+def test_tenant_key():
+    assert tenant_key("categories") == "categories"
+
+    token = current_tenant.set("acme")
+    try:
+        assert tenant_key("categories") == "acme:categories"
+    finally:
+        current_tenant.reset(token)
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import cache
+from app.core.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_entries_expire_after_their_ttl(clock):
+    entries = TTLCache(maxsize=10, ttl=60)
+    entries.set("default", 1)
+    entries.set("short", 2, ttl=5)
+
+    clock.now = 5
+    assert entries.get("short", "missing") == "missing"
+    assert entries.get("default") == 1
+
+    clock.now = 60
+    assert entries.get("default") is None
+
+
+def test_cache_without_ttl_keeps_entries(clock):
+    entries = TTLCache(maxsize=10, ttl=None)
+    entries.set("key", "value")
+
+    clock.now = 10**9
+    assert entries.get("key") == "value"
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    entries = TTLCache(maxsize=2)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+
+    assert entries.get("b") is None
+    assert (entries.get("a"), entries.get("c")) == (1, 3)
+    assert len(entries) == 2
+
+
+def test_pop_and_clear(clock):
+    entries = TTLCache()
+    entries.set("a", 1)
+    entries.set("b", 2)
+
+    assert entries.pop("a") == 1
+    assert entries.pop("a", "missing") == "missing"
+
+    entries.clear()
+    assert len(entries) == 0